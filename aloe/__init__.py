@@ -13,8 +13,10 @@ import sys
 import threading
 
 from aloe.registry import after, around, before, step
+from aloe.scoped import ScopedWorld
 
 world = threading.local()  # pylint:disable=invalid-name
+scoped_world = ScopedWorld()  # pylint:disable=invalid-name
 
 
 def main(argv=None):  # pragma: no cover
@@ -0,0 +1,215 @@
+"""
+Running coroutine steps and callbacks.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import contextlib
+import inspect
+import sys
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import asyncio
+except ImportError:  # Python 2
+    asyncio = None
+
+from aloe.utils import unwrap_function
+
+
+class EventLoopRunner(object):
+    """
+    Run the coroutines of the steps and callbacks in an event loop.
+
+    With the 'scenario' scope, each scenario (including its example
+    callbacks) gets a new event loop, which is closed when the scenario
+    finishes. With the 'session' scope, the scenarios share a single loop, so
+    that e.g. connection pools can be kept between them.
+
+    The coroutines run outside of the scenarios (e.g. feature callbacks) use
+    the session loop in either case. The loops are only created when a
+    coroutine is run, and each thread has its own.
+    """
+
+    scopes = ("scenario", "session")
+
+    def __init__(self, scope="scenario"):
+        self.scope = scope
+        self._local = threading.local()
+
+    @property
+    def loop(self):
+        """The event loop to run the coroutines in, creating it if needed."""
+
+        local = self._local
+        attr = "scenario_loop" if self.scope == "scenario" and getattr(local, "in_scenario", False) else "loop"
+
+        loop = getattr(local, attr, None)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            setattr(local, attr, loop)
+        asyncio.set_event_loop(loop)
+        return loop
+
+    def run(self, awaitable):
+        """Run a coroutine or another awaitable and return its result."""
+
+        if running_loop() is not None:
+            if inspect.iscoroutine(awaitable):
+                awaitable.close()
+            raise RuntimeError(
+                "Cannot run a coroutine step or callback while the event loop is running, e.g. with "
+                "self.given() in a coroutine step. Use 'await self.given_async()' (or when_async, then_async, "
+                "behave_as_async) instead."
+            )
+
+        return self.loop.run_until_complete(awaitable)
+
+    def begin_scenario(self):
+        """Start a scenario in the current thread."""
+        self._local.in_scenario = True
+
+    def end_scenario(self):
+        """Close the event loop of the scenario, if there is one."""
+
+        self._local.in_scenario = False
+        self._close("scenario_loop")
+
+    def close(self):
+        """Close the event loops of the current thread."""
+
+        self._close("scenario_loop")
+        self._close("loop")
+
+    def _close(self, attr):
+        """Close one of the event loops, if it exists."""
+
+        loop = getattr(self._local, attr, None)
+        if loop is None:
+            return
+
+        setattr(self._local, attr, None)
+        try:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
+
+EVENT_LOOP_RUNNER = EventLoopRunner()
+
+
+def running_loop():
+    """The event loop running in the current thread, if any."""
+
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def is_coroutine_function(func):
+    """Whether the function is a coroutine function."""
+    return asyncio is not None and asyncio.iscoroutinefunction(func)
+
+
+def is_async_manager(func):
+    """
+    Whether the function returns an asynchronous context manager, i.e. is
+    decorated with :func:`contextlib.asynccontextmanager`.
+    """
+
+    isasyncgenfunction = getattr(inspect, "isasyncgenfunction", None)
+    return isasyncgenfunction is not None and isasyncgenfunction(unwrap_function(func))
+
+
+def synchronous(func):
+    """
+    Make a coroutine function run to completion in the event loop when called.
+
+    Other functions are returned unchanged.
+    """
+
+    if not is_coroutine_function(func):
+        return func
+
+    @wraps(func)
+    def run_coroutine(*args, **kwargs):
+        """Run the coroutine function in the event loop."""
+        return EVENT_LOOP_RUNNER.run(func(*args, **kwargs))
+
+    return run_coroutine
+
+
+def synchronous_manager(func):
+    """
+    Make a function returning an asynchronous context manager return a
+    regular one, entering and exiting the original in the event loop.
+
+    Other functions are returned unchanged.
+    """
+
+    if not is_async_manager(func):
+        return func
+
+    @wraps(func)
+    @contextmanager
+    def run_manager(*args, **kwargs):
+        """Enter and exit the asynchronous context manager."""
+
+        manager = func(*args, **kwargs)
+        result = EVENT_LOOP_RUNNER.run(manager.__aenter__())
+        try:
+            yield result
+        except BaseException:
+            if not EVENT_LOOP_RUNNER.run(manager.__aexit__(*sys.exc_info())):
+                raise
+        else:
+            EVENT_LOOP_RUNNER.run(manager.__aexit__(None, None, None))
+
+    return run_manager
+
+
+async def maybe_await(result):
+    """Await the result of a function if it is awaitable."""
+
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def awaiting_callbacks(function, before_hooks, around_hooks, after_hooks, hook_args, hook_kwargs):
+    """
+    A coroutine function running the function with the callbacks, like
+    :meth:`aloe.registry.CallbackDict.wrap`, from a coroutine: the function,
+    coroutine callbacks and asynchronous context managers are awaited in the
+    running event loop.
+    """
+
+    @wraps(function)
+    async def wrapped(*args, **kwargs):
+        """Run all the hooks in proper relations to the event."""
+
+        for before_hook in before_hooks:
+            await maybe_await(before_hook(*hook_args, **hook_kwargs))
+
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for around_hook in around_hooks:
+                    manager = around_hook(*hook_args, **hook_kwargs)
+                    if hasattr(manager, "__aenter__"):
+                        await stack.enter_async_context(manager)
+                    else:
+                        stack.enter_context(manager)
+                return await maybe_await(function(*args, **kwargs))
+        finally:
+            # 'after' hooks still run after an exception
+            for after_hook in reversed(after_hooks):
+                await maybe_await(after_hook(*hook_args, **hook_kwargs))
+
+    return wrapped
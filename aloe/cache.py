@@ -0,0 +1,219 @@
+"""
+Caches of parsed feature files.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import fnmatch
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from aloe.exceptions import AloeSyntaxError
+from aloe.parser import Feature
+
+
+def gherkin_version():
+    """The installed version of the Gherkin parser."""
+
+    try:
+        try:
+            from importlib.metadata import version
+        except ImportError:
+            from pkg_resources import get_distribution
+
+            return get_distribution("gherkin-official").version
+        return version("gherkin-official")
+    except Exception:  # pylint:disable=broad-except
+        return "unknown"
+
+
+def file_digest(filename):
+    """The hash of a file's content."""
+
+    with open(filename, "rb") as file_:
+        return hashlib.sha1(file_.read()).hexdigest()
+
+
+class FeatureCache(object):
+    """
+    Gherkin parse results of feature files, kept between runs.
+
+    The results are stored in a key-value store with the interface of pytest's
+    `config.cache`, one entry per feature file. An entry is only used if the
+    file has the same modification time and size as when it was parsed, or
+    failing that, the same content hash; as well as the same Gherkin version
+    and language. This way, files which are only touched (e.g. by a fresh
+    checkout) don't need parsing again either.
+    """
+
+    prefix = "aloe/features/"
+
+    def __init__(self, store):
+        self.store = store
+        self.gherkin_version = gherkin_version()
+
+    def key(self, filename):
+        """The store key for a file."""
+
+        path = os.path.abspath(filename).encode("utf-8")
+        return self.prefix + hashlib.sha1(path).hexdigest()
+
+    def cached(self, filename, language):
+        """
+        Return the stored Gherkin parse result for a file, or None if there
+        isn't a valid one.
+        """
+
+        entry = self.store.get(self.key(filename), None)
+
+        if not entry or entry.get("gherkin") != self.gherkin_version or entry.get("language") != language:
+            return None
+
+        stat = os.stat(filename)
+        if entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            return entry["parsed"]
+
+        if entry.get("digest") == file_digest(filename):
+            # Remember the new modification time to avoid hashing next time
+            self.save(filename, language, entry["parsed"])
+            return entry["parsed"]
+
+        return None
+
+    def save(self, filename, language, parsed):
+        """Store the Gherkin parse result for a file."""
+
+        stat = os.stat(filename)
+
+        self.store.set(
+            self.key(filename),
+            {
+                "gherkin": self.gherkin_version,
+                "language": language,
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "digest": file_digest(filename),
+                "parsed": parsed,
+            },
+        )
+
+    def get(self, filename, language, parse):
+        """
+        Return the Gherkin parse result for a file, calling parse(filename)
+        and storing its result if there isn't a valid one stored.
+        """
+
+        parsed = self.cached(filename, language)
+
+        if parsed is None:
+            parsed = parse(filename)
+            self.save(filename, language, parsed)
+
+        return parsed
+
+
+def find_features(paths, norecursedirs=()):
+    """
+    Find all the feature files in the given files and directories, skipping
+    directories matching any of the norecursedirs patterns.
+    """
+
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path, followlinks=True):
+                dirnames[:] = sorted(
+                    dirname
+                    for dirname in dirnames
+                    if not any(fnmatch.fnmatch(dirname, pattern) for pattern in norecursedirs)
+                )
+                for filename in sorted(filenames):
+                    if filename.endswith(".feature"):
+                        yield os.path.join(dirpath, filename)
+        elif path.endswith(".feature") and os.path.isfile(path):
+            yield path
+
+
+def parse_feature_file(filename):
+    """
+    Parse a feature file in a worker process.
+
+    Returns a tuple of the Gherkin parse result and the syntax error message,
+    one of which is None.
+    """
+
+    try:
+        return (Feature.parse_gherkin(filename, filename=filename), None)
+    except AloeSyntaxError as ex:
+        return (None, ex.string)
+
+
+class ParallelFeatureParser(object):
+    """
+    Gherkin parse results of feature files, parsed in advance in a pool of
+    worker processes.
+
+    Has the same interface as :class:`FeatureCache`, which it can use to avoid
+    parsing the unchanged files. Files not known in advance are parsed when
+    requested.
+    """
+
+    def __init__(self, filenames, workers, cache=None):
+        self.cache = cache
+        self.executor = ProcessPoolExecutor(workers)
+
+        self.ready = {}
+        self.futures = {}
+
+        for filename in filenames:
+            key = os.path.abspath(filename)
+            if key in self.ready or key in self.futures:
+                continue
+
+            parsed = cache.cached(filename, None) if cache else None
+            if parsed is None:
+                self.futures[key] = self.executor.submit(parse_feature_file, filename)
+            else:
+                self.ready[key] = parsed
+
+    def get(self, filename, language, parse):
+        """
+        Return the Gherkin parse result for a file, calling parse(filename)
+        if it wasn't parsed in advance.
+        """
+
+        key = os.path.abspath(filename)
+
+        if language is None:
+            try:
+                return self.ready.pop(key)
+            except KeyError:
+                pass
+
+            future = self.futures.pop(key, None)
+            if future is not None:
+                parsed, error = future.result()
+                if error is not None:
+                    raise AloeSyntaxError(filename, error)
+                if self.cache:
+                    self.cache.save(filename, language, parsed)
+                return parsed
+
+        if self.cache:
+            return self.cache.get(filename, language, parse)
+        else:
+            return parse(filename)
+
+    def close(self):
+        """Stop parsing the files which weren't requested."""
+
+        for future in self.futures.values():
+            future.cancel()
+        self.futures.clear()
+        self.ready.clear()
+
+        # Only the files already being parsed are waited for
+        self.executor.shutdown(wait=True)
@@ -8,23 +8,35 @@ from __future__ import division
 from __future__ import absolute_import
 
 import ast
+import sys
+from collections import namedtuple
 from contextlib import contextmanager
+from dis import findlinestarts
+from itertools import groupby
 from textwrap import dedent
+from types import CodeType, TracebackType
 
-from aloe.utils import identifier
+from aloe.asynchronous import synchronous_manager
+from aloe.utils import identifier, lru_cache
 
 
 FUNCTION_DEF_SAMPLE = ast.parse("def func(): pass")
 
+# Whether the line numbers of compiled code can be changed by rewriting its
+# line table (co_lnotab only allows lines to go back from Python 3.6)
+PATCH_LINES = sys.version_info >= (3, 6)
+
+FunctionTemplate = namedtuple("FunctionTemplate", ("code", "name", "spans"))
+FunctionTemplate.__doc__ = """
+A compiled function definition: the module code defining it, the function
+name, and the first and last lines of each statement in the function body.
+"""
 
-def make_function(source, context=None, source_file=None, name=None):
-    """
-    Compile and evaluate given source to a function given the specified
-    globals.
-    Optionally set the file and name of the function.
-    """
 
-    func = ast.parse(source)
+def parse_function(source):
+    """Parse the source of a single function definition."""
+
+    func = ast.parse(source) if not isinstance(source, ast.AST) else source
 
     # Check that generated code is a function
     # pylint:disable=unidiomatic-typecheck
@@ -36,11 +48,234 @@ def make_function(source, context=None, source_file=None, name=None):
         raise ValueError("source must be a function definition.")
     # pylint:enable=unidiomatic-typecheck
 
-    # Set or record the function name
-    if name is not None:
-        func.body[0].name = name = identifier(name)
+    return func
+
+
+@lru_cache(maxsize=256)
+def compile_template(source):
+    """
+    Compile the source of a function definition once, to be reused with
+    different names, files and line numbers by :func:`patch_code`.
+    """
+
+    func = parse_function(source)
+
+    spans = tuple(
+        (
+            statement.lineno,
+            getattr(statement, "end_lineno", None)
+            or max(getattr(node, "lineno", statement.lineno) for node in ast.walk(statement)),
+        )
+        for statement in func.body[0].body
+    )
+
+    return FunctionTemplate(compile(func, "<generated>", "exec"), func.body[0].name, spans)
+
+
+def encode_lnotab(line_starts, first_line):
+    """Encode (offset, line) pairs into the co_lnotab format."""
+
+    lnotab = bytearray()
+    last_offset, last_line = 0, first_line
+
+    for offset, line in line_starts:
+        offset_delta, line_delta = offset - last_offset, line - last_line
+        while offset_delta > 255:
+            lnotab.extend((255, 0))
+            offset_delta -= 255
+        while line_delta > 127:
+            lnotab.extend((offset_delta, 127))
+            offset_delta, line_delta = 0, line_delta - 127
+        while line_delta < -128:
+            lnotab.extend((offset_delta, 128))
+            offset_delta, line_delta = 0, line_delta + 128
+        lnotab.extend((offset_delta, line_delta & 0xFF))
+        last_offset, last_line = offset, line
+
+    return bytes(lnotab)
+
+
+def encode_linetable(line_ranges, first_line):
+    """
+    Encode (start, end, line) ranges of bytecode into the co_linetable
+    format of Python 3.10.
+    """
+
+    linetable = bytearray()
+    last_end, last_line = 0, first_line
+
+    for _, end, line in line_ranges:
+        if line is None:
+            line_delta = -128
+        else:
+            line_delta, last_line = line - last_line, line
+            while line_delta > 127:
+                linetable.extend((0, 127))
+                line_delta -= 127
+            while line_delta < -127:
+                linetable.extend((0, -127 & 0xFF))
+                line_delta += 127
+
+        length, last_end = end - last_end, end
+        while True:
+            linetable.extend((min(length, 254), line_delta & 0xFF))
+            length -= min(length, 254)
+            if not length:
+                break
+            if line is not None:
+                line_delta = 0
+
+    return bytes(linetable)
+
+
+def encode_varint(value):
+    """Encode an unsigned integer into the varint format of co_linetable."""
+
+    encoded = bytearray()
+    while value >= 64:
+        encoded.append(64 | value & 63)
+        value >>= 6
+    encoded.append(value)
+    return encoded
+
+
+@lru_cache(maxsize=256)
+def position_runs(code):
+    """
+    The (line, end line, column, end column) positions of the code units of
+    the code on Python 3.11+, as runs of (position, number of code units).
+    """
+
+    return tuple((position, len(tuple(units))) for position, units in groupby(code.co_positions()))
+
+
+def encode_locations(runs, first_line):
+    """
+    Encode runs of (position, number of code units) into the co_linetable
+    format of Python 3.11+.
+    """
+
+    linetable = bytearray()
+    last_line = first_line
+
+    for (line, end_line, column, end_column), length in runs:
+        while length:
+            size = min(length, 8)
+            length -= size
+
+            if line is None:
+                # No location
+                linetable.append(0x80 | 15 << 3 | size - 1)
+                continue
+
+            line_delta, last_line = line - last_line, line
+            line_delta = -line_delta << 1 | 1 if line_delta < 0 else line_delta << 1
+            if column is None or end_column is None:
+                # No column information
+                linetable.append(0x80 | 13 << 3 | size - 1)
+                linetable.extend(encode_varint(line_delta))
+            else:
+                # Long form
+                linetable.append(0x80 | 14 << 3 | size - 1)
+                for value in (line_delta, max((end_line or line) - line, 0), column + 1, end_column + 1):
+                    linetable.extend(encode_varint(value))
+
+    return bytes(linetable)
+
+
+def replace_code(code, **changes):
+    """A copy of a code object with the given attributes changed."""
+
+    if hasattr(code, "replace"):
+        return code.replace(**changes)
+
+    attributes = (
+        "co_argcount",
+        "co_kwonlyargcount",
+        "co_nlocals",
+        "co_stacksize",
+        "co_flags",
+        "co_code",
+        "co_consts",
+        "co_names",
+        "co_varnames",
+        "co_filename",
+        "co_name",
+        "co_firstlineno",
+        "co_lnotab",
+        "co_freevars",
+        "co_cellvars",
+    )
+    return CodeType(*(changes.get(attribute, getattr(code, attribute)) for attribute in attributes))
+
+
+def patch_code(code, filename, lines, rename=None):
+    """
+    Change the file name of the code and the code objects in its constants,
+    and map their line numbers.
+
+    The names, string constants (e.g. qualified names) and nested code object
+    names found in rename are renamed as well, without affecting the nested
+    code.
+    """
+
+    rename = rename or {}
+
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            const = patch_code(const, filename, lines)
+            if const.co_name in rename:
+                renamed = {"co_name": rename[const.co_name]}
+                if hasattr(const, "co_qualname"):
+                    renamed["co_qualname"] = rename.get(const.co_qualname, const.co_qualname)
+                const = replace_code(const, **renamed)
+        elif isinstance(const, str):
+            const = rename.get(const, const)
+        consts.append(const)
+
+    first_line = lines.get(code.co_firstlineno, code.co_firstlineno)
+
+    changes = {}
+    if hasattr(code, "co_positions"):
+        # The columns of the generated code are meaningless at moved lines
+        changes["co_linetable"] = encode_locations(
+            (
+                ((lines[position[0]], lines[position[0]], None, None) if position[0] in lines else position, length)
+                for position, length in position_runs(code)
+            ),
+            first_line,
+        )
+    elif hasattr(code, "co_lines"):
+        changes["co_linetable"] = encode_linetable(
+            ((start, end, lines.get(line, line)) for start, end, line in code.co_lines()), first_line
+        )
     else:
-        name = func.body[0].name
+        changes["co_lnotab"] = encode_lnotab(
+            ((offset, lines.get(line, line)) for offset, line in findlinestarts(code)), first_line
+        )
+
+    return replace_code(
+        code,
+        co_consts=tuple(consts),
+        co_names=tuple(rename.get(name, name) for name in code.co_names),
+        co_filename=filename,
+        co_firstlineno=first_line,
+        **changes
+    )
+
+
+def make_function(source, context=None, source_file=None, name=None, statement_lines=None):
+    """
+    Compile and evaluate given source to a function given the specified
+    globals.
+    Optionally set the file and name of the function, and the line numbers
+    of the statements in its body (None to keep the line in the source).
+
+    Function definitions given as a string are only compiled once; for the
+    following calls, the compiled code is reused with the name, file and
+    lines changed.
+    """
 
     # TODO: What's a better default for file?
     if source_file is None:
@@ -48,15 +283,86 @@ def make_function(source, context=None, source_file=None, name=None):
 
     context = context or {}
 
-    code = compile(func, source_file, "exec")
+    if PATCH_LINES and not isinstance(source, ast.AST):
+        code, name = make_code(source, source_file, name, statement_lines)
+    else:
+        func = parse_function(source)
+
+        # Set or record the function name
+        if name is not None:
+            func.body[0].name = name = identifier(name)
+        else:
+            name = func.body[0].name
+
+        if statement_lines is not None:
+            for statement, line in zip(func.body[0].body, statement_lines):
+                if line is not None:
+                    for node in ast.walk(statement):
+                        # Python 3.10+ rejects nodes ending before they start
+                        node.lineno = node.end_lineno = line
+                        if getattr(node, "end_col_offset", None) is not None:
+                            node.end_col_offset = max(node.col_offset, node.end_col_offset)
+
+        code = compile(func, source_file, "exec")
+
     eval(code, context)  # pylint:disable=eval-used
 
     return context[name]
 
 
+def make_code(source, source_file, name, statement_lines):
+    """
+    The code defining a function from its source, reusing the compiled
+    template. Returns the code and the function name.
+    """
+
+    template = compile_template(source)
+
+    rename = {}
+    if name is not None:
+        name = identifier(name)
+        if name != template.name:
+            rename[template.name] = name
+    else:
+        name = template.name
+
+    lines = {}
+    for (first, last), line in zip(template.spans, statement_lines or ()):
+        if line is not None:
+            lines.update((source_line, line) for source_line in range(first, last + 1))
+
+    return patch_code(template.code, source_file, lines, rename), name
+
+
+# A function returning its own frame, compiled once by compile_template
+LOCATION_SOURCE = "def location():\n    return sys._getframe()"
+
+
+def relocate_traceback(traceback, filename, line, name):
+    """
+    A traceback continuing like the given one, but starting at the given line
+    of a function with the given name and file instead of the frame handling
+    the exception.
+
+    Before Python 3.7, tracebacks cannot be constructed and the given one is
+    returned.
+    """
+
+    # Python 3.11+ take the line of traceback entries from the code
+    frame = make_function(
+        LOCATION_SOURCE, context={"sys": sys}, source_file=filename, name=name, statement_lines=(line,)
+    )()
+
+    try:
+        return TracebackType(traceback.tb_next, frame, frame.f_lasti, line)
+    except TypeError:
+        return traceback
+
+
 def multi_manager(*managers):
     """
     A context manager invoking all the given context managers in order.
+    Asynchronous context managers are entered and exited in the event loop.
 
     Returns a tuple with all the manager results.
     """
@@ -81,6 +387,6 @@ def multi_manager(*managers):
             """
         ).format(with_stmt=with_stmt, result_tuple=result_tuple)
 
-    context = {"manager" + str(i): manager for i, manager in enumerate(managers)}
+    context = {"manager" + str(i): synchronous_manager(manager) for i, manager in enumerate(managers)}
 
     return contextmanager(make_function(source=source, context=context))
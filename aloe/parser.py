@@ -14,7 +14,8 @@ from builtins import *
 # pylint:enable=redefined-builtin,wildcard-import,unused-wildcard-import
 
 import os
-from collections import OrderedDict
+import re
+from collections import OrderedDict, namedtuple
 from copy import copy
 
 from gherkin.dialect import Dialect
@@ -24,13 +25,52 @@ from gherkin.token_matcher import TokenMatcher
 
 from aloe import strings
 from aloe.exceptions import AloeSyntaxError
-from aloe.utils import memoizedproperty
+from aloe.utils import lru_cache, memoizedproperty
+
+try:
+    from sys import intern
+except ImportError:  # Python 2
+    pass
 
 # Pylint can't figure out methods vs. properties and which classes are
 # abstract
 # pylint:disable=abstract-method
 
 
+PLACEHOLDER_RE = re.compile(r"<([^<>]*)>")
+
+
+class Template(object):
+    """
+    A string with outline <placeholders>, split once so that substituting an
+    outline is a single pass over it.
+    """
+
+    __slots__ = ("string", "parts")
+
+    def __init__(self, string):
+        self.string = string
+        # Literal text alternating with placeholder names
+        self.parts = PLACEHOLDER_RE.split(string)
+
+    def render(self, outline):
+        """
+        The string with the placeholders replaced by the outline values.
+        Placeholders not in the outline are left as they are.
+        """
+
+        parts = self.parts
+        if len(parts) == 1:
+            return self.string
+
+        rendered = list(parts)
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            rendered[i] = outline[name] if name in outline else "<" + name + ">"
+
+        return "".join(rendered)
+
+
 class LanguageTokenMatcher(TokenMatcher):
     """Gherkin 3 token matcher that always uses the given language."""
 
@@ -44,21 +84,161 @@ class LanguageTokenMatcher(TokenMatcher):
 
 
 def cell_values(row):
-    """Extract cell values from a table header or row."""
+    """
+    Extract cell values from a table header or row.
+
+    The values are interned, as tables tend to repeat them.
+    """
 
-    return tuple(cell["value"] for cell in row["cells"])
+    return tuple(intern(cell["value"]) for cell in row["cells"])
+
+
+@lru_cache(100)
+def get_dialect(language):
+    """The Gherkin dialect for a language."""
+
+    return Dialect.for_name(language)
+
+
+@lru_cache(100)
+def language_step_keywords(language):
+    """
+    An appropriate keyword for each kind of step (given, when, then) in a
+    language.
+    """
+
+    dialect = get_dialect(language)
+
+    # Gherkin allows '*' as a keyword; skip it to be sure the keyword is
+    # specifically for the given kind
+    return {
+        kind: next(keyword for keyword in keywords if not keyword.startswith("*"))
+        for kind, keywords in (
+            ("given", dialect.given_keywords),
+            ("when", dialect.when_keywords),
+            ("then", dialect.then_keywords),
+        )
+    }
+
+
+@lru_cache(4096)
+def parse_snippet(language, container_kind, string):
+    """
+    Parse a string of steps in a scenario or a background (container_kind)
+    into the Gherkin parse results for the steps.
+
+    A single step line is parsed directly, anything else is wrapped into a
+    feature for the Gherkin parser.
+    """
+
+    dialect = get_dialect(language)
+
+    # The location of the steps in the feature below
+    line, indent = 6, 8
+
+    if "\n" not in string and "\r" not in string:
+        text = string.lstrip()
+        column = indent + len(string) - len(text) + 1
+
+        # Same order as Gherkin's token matcher
+        for keyword in (
+            dialect.given_keywords
+            + dialect.when_keywords
+            + dialect.then_keywords
+            + dialect.and_keywords
+            + dialect.but_keywords
+        ):
+            if text.startswith(keyword):
+                return (
+                    {
+                        "type": "Step",
+                        "location": {"line": line, "column": column},
+                        "keyword": keyword,
+                        "text": text[len(keyword) :].strip(),
+                    },
+                )
+
+    if container_kind == "scenario":
+        container_text = "%s: scenario" % dialect.scenario_keywords[0]
+    else:
+        container_text = "%s: " % dialect.background_keywords[0]
+
+    # Gherkin can't parse anything other than complete features
+    feature_string = """
+        # language: {language}
+        {feature_keyword}: feature
+
+        {container_text}
+        {string}
+        """.format(
+        language=language,
+        feature_keyword=dialect.feature_keywords[0],
+        container_text=container_text,
+        string=string,
+    )
+
+    parsed = Feature.parse_gherkin(feature_string)
+
+    return tuple(parsed["feature"]["children"][0]["steps"])
+
+
+@lru_cache(100)
+def slot_names(cls):
+    """The names of the slots of a class and its bases holding attributes."""
+
+    return tuple(
+        name
+        for klass in cls.__mro__
+        for name in getattr(klass, "__slots__", ())
+        if name not in ("__dict__", "__weakref__")
+    )
 
 
 class Node(object):
     """
     A base parse node.
+
+    The nodes keep their attributes in slots, which the concrete node classes
+    define (including the ones of the base classes, as several of these are
+    mixed together). A __dict__ is still available for the memoized
+    properties and any other attributes.
     """
 
+    __slots__ = ()
+
     def __init__(self, parsed, filename=None):
         """Construct the node from Gherkin parse results."""
+        # The slots are defined by the concrete node classes
+        # pylint:disable=assigning-non-slot
         self.line = parsed["location"]["line"]
         self.col = parsed["location"]["column"]
-        self.filename = filename
+        self.filename = intern(filename) if filename else filename
+        # pylint:enable=assigning-non-slot
+
+    def __copy__(self):
+        """
+        A shallow copy of the node, without the values of the memoized
+        properties.
+        """
+
+        cls = type(self)
+        copied = cls.__new__(cls)
+
+        for name in slot_names(cls):
+            try:
+                setattr(copied, name, getattr(self, name))
+            except AttributeError:
+                pass
+
+        attributes = {
+            name: value
+            for name, value in getattr(self, "__dict__", {}).items()
+            if not isinstance(getattr(cls, name, None), memoizedproperty)
+        }
+        if attributes:
+            copied.__dict__.update(attributes)
+
+        return copied
 
     @property
     def feature(self):
@@ -96,48 +276,26 @@ class Step(Node):
     :class:`Step`.
     """
 
-    table = None
-    """
-    A Gherkin table as an iterable of rows, themselves iterables of cells.
-
-    e.g.:
-
-    .. code-block:: gherkin
-
-        Then I have fruit:
-            | apples | oranges |
-            | 0      | 2       |
-
-    Becomes:
-
-    .. code-block:: python
-
-        (('apples', 'oranges'), ('0', '2'))
-    """
-
-    multiline = None
-    """
-    A Gherkin multiline string with the appropriate indenting removed.
-
-    .. code-block:: gherkin
-
-        Then I have poem:
-            \"\"\"
-            Glittering-Minded deathless Aphrodite,
-            I beg you, Zeus’s daughter, weaver of snares,
-            Don’t shatter my heart with fierce
-            Pain, goddess,
-            \"\"\"
-    """
-
-    outline = None
-    """
-    If this step is a part of an outline, the reference to the outline.
-    """
+    __slots__ = (
+        "line",
+        "col",
+        "filename",
+        "sentence",
+        "background",
+        "scenario",
+        "table",
+        "multiline",
+        "outline",
+        "__dict__",
+    )
 
     def __init__(self, parsed, background=None, scenario=None, **kwargs):
         super().__init__(parsed, **kwargs)
 
+        self.table = None
+        self.multiline = None
+        self.outline = None
+
         if background:
             self.background = background
         elif scenario:
@@ -186,31 +344,22 @@ class Step(Node):
         """
 
         try:
-            self.scenario  # pylint:disable=pointless-statement
-            container_text = "%s: scenario" % self.feature.dialect.scenario_keywords[0]
-            is_scenario = True
+            container = self.scenario
+            container_kind = "scenario"
         except AttributeError:
-            container_text = "%s: " % self.feature.dialect.background_keywords[0]
-            is_scenario = False
+            container = self.background
+            container_kind = "background"
 
-        # Gherkin can't parse anything other than complete features
-        feature_string = """
-        # language: {feature.language}
-        {feature.keyword}: feature
+        try:
+            parsed_steps = parse_snippet(self.feature.language, container_kind, string)
+        except AloeSyntaxError as ex:
+            raise AloeSyntaxError(self.filename, ex.string)
 
-        {container_text}
-        {string}
-        """.format(
-            container_text=container_text, feature=self.feature, string=string
+        return tuple(
+            container.step_class(parsed, filename=self.filename, **{container_kind: container})
+            for parsed in parsed_steps
         )
 
-        feature = self.feature.parse(string=feature_string, filename=self.filename)
-
-        if is_scenario:
-            return feature.scenarios[0].steps
-        else:
-            return feature.background.steps
-
     @property
     def feature(self):
         """
@@ -316,27 +465,36 @@ class Step(Node):
 
         return "\n".join(lines)
 
+    @memoizedproperty
+    def templates(self):
+        """
+        The :class:`Template` for the sentence, the multiline and each table
+        cell of the step.
+        """
+
+        return (
+            Template(self.sentence),
+            Template(self.multiline) if self.multiline else None,
+            tuple(tuple(Template(cell) for cell in row) for row in self.table) if self.table else None,
+        )
+
     def resolve_substitutions(self, outline):
         """
         Creates a copy of the step with any <variables> resolved.
         """
 
-        replaced = copy(self)
+        # pylint cannot infer the value of a memoizedproperty
+        sentence, multiline, table = self.templates  # pylint:disable=unpacking-non-sequence
 
-        def replace_vars(string):
-            """Replace all the variables in a string."""
-            for key, value in outline.items():
-                key = "<{key}>".format(key=key)
-                string = string.replace(key, value)
-            return string
+        replaced = copy(self)
 
-        replaced.sentence = replace_vars(self.sentence)
+        replaced.sentence = sentence.render(outline)
 
-        if self.multiline:
-            replaced.multiline = replace_vars(self.multiline)
+        if multiline:
+            replaced.multiline = multiline.render(outline)
 
-        if self.table:
-            replaced.table = tuple(tuple(replace_vars(cell) for cell in row) for row in self.table)
+        if table:
+            replaced.table = tuple(tuple(cell.render(outline) for cell in row) for row in table)
 
         replaced.outline = outline
 
@@ -348,17 +506,14 @@ class Step(Node):
         (Given, When, Then) for the language the current step is written in.
         """
 
-        dialect = self.feature.dialect
-        keywords = {"given": dialect.given_keywords, "when": dialect.when_keywords, "then": dialect.then_keywords}[kind]
-
-        # Gherkin allows '*' as a keyword; skip it to be sure the keyword is
-        # specifically for the given kind
-        return next(keyword for keyword in keywords if not keyword.startswith("*"))
+        return self.feature.step_keywords[kind]
 
 
 class StepContainer(Node):
     """A node containing steps, e.g. Feature:, Scenario:"""
 
+    __slots__ = ()
+
     step_class = Step
 
     container_name = "container"  # override in subclasses
@@ -370,12 +525,14 @@ class StepContainer(Node):
     def __init__(self, parsed, feature=None, filename=None, **kwargs):
         super().__init__(parsed, filename=filename, **kwargs)
 
+        # pylint:disable=assigning-non-slot
         self._feature = feature
 
         # Put a reference to the parent node into all the steps
         parent_ref = {self.container_name: self}
 
         self.steps = tuple(self.step_class(step, filename=filename, **parent_ref) for step in parsed["steps"])
+        # pylint:enable=assigning-non-slot
 
     indent = 2
 
@@ -383,13 +540,17 @@ class StepContainer(Node):
 class HeaderNode(Node):
     """A node with a header consisting of a keyword and a name."""
 
+    __slots__ = ()
+
     name_required = True
 
     def __init__(self, parsed, **kwargs):
         super().__init__(parsed, **kwargs)
 
+        # pylint:disable=assigning-non-slot
         self.keyword = parsed["keyword"]
         self.name = parsed["name"].strip()
+        # pylint:enable=assigning-non-slot
 
         if self.name_required and self.name == "":
             raise AloeSyntaxError(
@@ -415,10 +576,12 @@ class HeaderNode(Node):
 class TaggedNode(Node):
     """A node with attached tags."""
 
+    __slots__ = ()
+
     def __init__(self, parsed, **kwargs):
         super().__init__(parsed, **kwargs)
 
-        self._tags = tuple(tag["name"][1:] for tag in parsed["tags"])
+        self._tags = tuple(tag["name"][1:] for tag in parsed["tags"])  # pylint:disable=assigning-non-slot
 
     @property
     def tags(self):
@@ -445,6 +608,8 @@ class TaggedNode(Node):
 class Background(HeaderNode, StepContainer):
     """The background of all :class:`Scenario` in a :class:`Feature`."""
 
+    __slots__ = ("line", "col", "filename", "keyword", "name", "_feature", "steps", "__dict__")
+
     container_name = "background"
     name_required = False
 
@@ -461,25 +626,87 @@ class Outline(OrderedDict, Node):
         # Store the file and line information
         Node.__init__(self, table_row, filename=filename)
 
+    @classmethod
+    def from_row(cls, row):
+        """Construct the outline from an :class:`OutlineRow`."""
+
+        outline = cls.__new__(cls)
+        OrderedDict.__init__(outline, zip(row.keys, row.values))
+        outline.line = row.line
+        outline.col = row.col
+        outline.filename = None
+        return outline
+
+    def __copy__(self):
+        """A shallow copy of the outline, with its values and location."""
+
+        copied = Node.__copy__(self)
+        OrderedDict.__init__(copied, self)
+        return copied
+
+
+class OutlineRow(namedtuple("OutlineRow", ("keys", "values", "line", "col"))):
+    """
+    An example row of a scenario outline, stored compactly: the rows of an
+    Examples table share the same keys.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_parsed(cls, keys, table_row):
+        """Construct the row from Gherkin parse results."""
+
+        location = table_row["location"]
+        return cls(keys, cell_values(table_row), location["line"], location["column"])
+
 
 class Scenario(HeaderNode, TaggedNode, StepContainer):
     """A scenario within a :class:`Feature`."""
 
+    __slots__ = ("line", "col", "filename", "keyword", "name", "_tags", "_feature", "steps", "outline_rows", "__dict__")
+
     container_name = "scenario"
 
     def __init__(self, parsed, **kwargs):
         super().__init__(parsed, **kwargs)
 
-        # Build a list of outline hashes
+        # Build a list of outline rows; the outline hashes are only built
+        # when needed.
         # A single scenario can have multiple example blocks, the returned
         # token is a list of table tokens
-        self.outlines = ()
+        outline_rows = []
 
         for example_table in parsed.get("examples", ()):
             # the first row of the table is the column headings
             keys = cell_values(example_table["tableHeader"])
 
-            self.outlines += tuple(Outline(keys, row) for row in example_table["tableBody"])
+            outline_rows.extend(OutlineRow.from_parsed(keys, row) for row in example_table["tableBody"])
+
+        self.outline_rows = tuple(outline_rows)
+
+    @memoizedproperty
+    def outlines(self):
+        """
+        The :class:`Outline` for each example of the scenario.
+
+        Use :meth:`iter_outlines` to go through the examples without keeping
+        them all in memory.
+        """
+
+        return tuple(Outline.from_row(row) for row in self.outline_rows)
+
+    def iter_outlines(self):
+        """
+        Iterate over the :class:`Outline` for each example of the scenario,
+        constructing them one at a time unless :attr:`outlines` was already
+        built.
+        """
+
+        try:
+            return iter(self.__dict__["outlines"])
+        except KeyError:
+            return (Outline.from_row(row) for row in self.outline_rows)
 
     indent = 2
 
@@ -514,15 +741,16 @@ class Scenario(HeaderNode, TaggedNode, StepContainer):
         # get the list of column headings
         headings_dict = OrderedDict()
 
-        for outline in self.outlines:
-            headings_dict.update(outline)
+        for row in self.outline_rows:
+            headings_dict.update(zip(row.keys, row.values))
 
         headings = list(headings_dict.keys())
         table = [headings]
 
         # append the data to the table
-        for outline in self.outlines:
-            table.append([outline.get(cell, "") for cell in headings])
+        for row in self.outline_rows:
+            values = dict(zip(row.keys, row.values))
+            table.append([values.get(cell, "") for cell in headings])
 
         return table
 
@@ -537,14 +765,21 @@ class Scenario(HeaderNode, TaggedNode, StepContainer):
         Yield the outline and steps.
         """
 
-        for outline in self.outlines:
-            steps = [step.resolve_substitutions(outline) for step in self.steps]
+        for outline in self.iter_outlines():
+            yield (outline, self.evaluate(outline))
+
+    def evaluate(self, outline):
+        """
+        The steps of the scenario with the outline substituted.
+        """
+
+        steps = [step.resolve_substitutions(outline) for step in self.steps]
 
-            # set a backref to the scenario
-            for step in steps:
-                step.scenario = self
+        # set a backref to the scenario
+        for step in steps:
+            step.scenario = self
 
-            yield (outline, steps)
+        return steps
 
 
 class Description(Node):
@@ -552,6 +787,8 @@ class Description(Node):
     The description block of a feature.
     """
 
+    __slots__ = ("line", "col", "filename", "lines", "__dict__")
+
     def __init__(self, parsed, **kwargs):
         super().__init__(parsed, **kwargs)
 
@@ -611,17 +848,31 @@ class Feature(HeaderNode, TaggedNode):
     :func:`from_string`.
     """
 
+    __slots__ = (
+        "line",
+        "col",
+        "filename",
+        "keyword",
+        "name",
+        "_tags",
+        "language",
+        "description_node",
+        "background",
+        "scenarios",
+        "__dict__",
+    )
+
     background_class = Background
     scenario_class = Scenario
 
-    background = None
-
     def __init__(self, parsed, filename=None, **kwargs):
         # Gherkin's top level definition is a GherkinDocument, which doesn't
         # have a location
         parsed = parsed["feature"]
         super().__init__(parsed, filename=filename, **kwargs)
 
+        self.background = None
+
         self.language = parsed["language"]
 
         self.description_node = Description(parsed, filename=filename)
@@ -638,12 +889,33 @@ class Feature(HeaderNode, TaggedNode):
 
         self.scenarios = tuple(self.scenario_class(scenario, filename=filename, feature=self) for scenario in scenarios)
 
+    parse_cache = None
+    """
+    A :class:`aloe.cache.FeatureCache` to keep the Gherkin parse results of
+    feature files in, if set.
+    """
+
     @classmethod
     def parse(cls, string=None, filename=None, language=None):
         """
         Parse either a string or a file.
         """
 
+        if string is None and cls.parse_cache is not None:
+            parsed = cls.parse_cache.get(
+                filename, language, lambda filename: cls.parse_gherkin(filename, language, filename=filename)
+            )
+        else:
+            parsed = cls.parse_gherkin(string or filename, language, filename=filename)
+
+        return cls(parsed, filename=filename)
+
+    @staticmethod
+    def parse_gherkin(string_or_filename, language=None, filename=None):
+        """
+        Parse either a string or a file into a Gherkin document.
+        """
+
         parser = Parser()
         if language:
             if language == "pt-br":
@@ -653,7 +925,7 @@ class Feature(HeaderNode, TaggedNode):
             token_matcher = TokenMatcher()
 
         try:
-            return cls(parser.parse(string or filename, token_matcher=token_matcher), filename=filename)
+            return parser.parse(string_or_filename, token_matcher=token_matcher)
         except ParserError as ex:
             raise AloeSyntaxError(filename, str(ex))
 
@@ -681,13 +953,22 @@ class Feature(HeaderNode, TaggedNode):
         """
         return str(self.description_node)
 
-    @property
+    @memoizedproperty
     def dialect(self):
         """
         The Gherkin dialect for the feature.
         """
 
-        return Dialect.for_name(self.language)
+        return get_dialect(self.language)
+
+    @memoizedproperty
+    def step_keywords(self):
+        """
+        An appropriate keyword for each kind of step (given, when, then) in
+        the language of the feature.
+        """
+
+        return language_step_keywords(self.language)
 
     @property
     def feature(self):
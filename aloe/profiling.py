@@ -0,0 +1,188 @@
+"""
+Profiling the stages of generating the tests from the features.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import io
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from time import time as perf_counter
+
+from aloe import codegen, testclass
+from aloe.parser import Feature, Scenario
+from aloe.registry import CallbackDict, StepDict
+
+
+# stage -> the functions to time, as (owner, attribute)
+STAGES = OrderedDict(
+    (
+        ("parse", ((Feature, "parse"),)),
+        ("outlines", ((Scenario, "evaluate"),)),
+        ("match", ((StepDict, "match_step"), (StepDict, "match_definition"))),
+        ("wrap", ((CallbackDict, "wrap"),)),
+        ("compile", ((codegen, "make_function"), (testclass, "make_function"))),
+    )
+)
+
+
+class CollectionProfiler(object):
+    """
+    Record the time spent and the number of calls in each stage of generating
+    the tests: parsing the features, expanding the scenario outlines,
+    matching the steps, wrapping the functions in callbacks and compiling the
+    generated code. The times are recorded for the feature file being
+    collected.
+
+    The time of a stage excludes the stages called from it (e.g. compiling
+    the combined callbacks when wrapping a step), so the stages add up.
+    """
+
+    # Recorded outside of collecting a feature file
+    other = "(other)"
+
+    def __init__(self):
+        # filename -> stage -> [time, calls]
+        self.by_file = OrderedDict()
+        # filename -> total time collecting the file
+        self.file_times = OrderedDict()
+        self.current_file = self.other
+        # The time spent in the nested stages of the running ones
+        self.nested = []
+        self.originals = []
+
+    def install(self):
+        """Start timing the stages."""
+
+        for stage, targets in STAGES.items():
+            for owner, name in targets:
+                original = vars(owner)[name]
+                self.originals.append((owner, name, original))
+                setattr(owner, name, self.timed_attribute(stage, original))
+
+    def uninstall(self):
+        """Stop timing the stages."""
+
+        while self.originals:
+            owner, name, original = self.originals.pop()
+            setattr(owner, name, original)
+
+    def timed_attribute(self, stage, attribute):
+        """A class or module attribute timing the stage when called."""
+
+        if isinstance(attribute, classmethod):
+            return classmethod(self.timed(stage, attribute.__func__))
+        elif isinstance(attribute, staticmethod):
+            return staticmethod(self.timed(stage, attribute.__func__))
+        return self.timed(stage, attribute)
+
+    def timed(self, stage, function):
+        """Wrap a function to record its time in the stage."""
+
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+            """Time the stage."""
+
+            self.nested.append(0)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                nested = self.nested.pop()
+                if self.nested:
+                    self.nested[-1] += elapsed
+                self.record(stage, elapsed - nested)
+
+        return wrapped
+
+    def record(self, stage, duration):
+        """Record a call of a stage for the current file."""
+
+        stages = self.by_file.setdefault(self.current_file, OrderedDict())
+        try:
+            stages[stage][0] += duration
+            stages[stage][1] += 1
+        except KeyError:
+            stages[stage] = [duration, 1]
+
+    @contextmanager
+    def collecting(self, filename):
+        """Record the stages and the total time for a feature file."""
+
+        self.current_file = filename
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.file_times[filename] = self.file_times.get(filename, 0) + perf_counter() - start
+            self.current_file = self.other
+
+    def stages(self):
+        """The total time and calls of each stage, as (stage, time, calls)."""
+
+        totals = OrderedDict((stage, [0, 0]) for stage in STAGES)
+        for stages in self.by_file.values():
+            for stage, (duration, calls) in stages.items():
+                totals[stage][0] += duration
+                totals[stage][1] += calls
+        return [(stage, duration, calls) for stage, (duration, calls) in totals.items()]
+
+    def summary(self, count=10):
+        """The lines of tables of the stages and the slowest files."""
+
+        stages = self.stages()
+        total = sum(duration for _, duration, _ in stages)
+
+        lines = ["{:<10} {:>9} {:>10} {:>6}".format("stage", "calls", "time", "%")]
+        lines.extend(
+            "{:<10} {:>9} {:>9.3f}s {:>5.1f}%".format(stage, calls, duration, 100 * duration / total if total else 0)
+            for stage, duration, calls in stages
+        )
+
+        slowest = sorted(self.file_times.items(), key=lambda item: item[1], reverse=True)[:count]
+        if slowest:
+            lines.append("")
+            lines.append("{:>10}  ".format("total") + "".join("{:>10}".format(stage) for stage in STAGES) + "  file")
+            for filename, duration in slowest:
+                stages = self.by_file.get(filename, {})
+                lines.append(
+                    "{:>9.3f}s  ".format(duration)
+                    + "".join("{:>9.3f}s".format(stages.get(stage, (0,))[0]) for stage in STAGES)
+                    + "  "
+                    + os.path.relpath(filename)
+                )
+
+        return lines
+
+    def as_dict(self):
+        """The recorded times, to be saved as JSON."""
+
+        return {
+            "stages": {stage: {"time": duration, "calls": calls} for stage, duration, calls in self.stages()},
+            "files": {
+                filename: {
+                    "total": self.file_times.get(filename),
+                    "stages": {
+                        stage: {"time": duration, "calls": calls} for stage, (duration, calls) in stages.items()
+                    },
+                }
+                for filename, stages in self.by_file.items()
+            },
+        }
+
+    def dump(self, filename):
+        """Save the recorded times to a JSON file."""
+
+        with io.open(filename, "w", encoding="utf-8") as output:
+            output.write(json.dumps(self.as_dict(), indent=2, sort_keys=True))
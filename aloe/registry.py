@@ -16,9 +16,16 @@ from builtins import str
 # pylint:enable=redefined-builtin
 
 import re
-from collections import OrderedDict
+from collections import namedtuple, OrderedDict
 from functools import wraps, partial
+from itertools import count
 
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse  # pylint:disable=deprecated-module
+
+from aloe.asynchronous import awaiting_callbacks, synchronous
 from aloe.codegen import multi_manager
 from aloe.exceptions import undefined_step, StepLoadingError
 from aloe.utils import unwrap_function
@@ -32,6 +39,57 @@ HOOK_WHAT = ("all", "feature", "example", "step")
 HOOK_WHEN = ("before", "after", "around")
 
 
+# Zero-width assertions that a literal word can be bounded by
+WORD_BOUNDARIES = (
+    sre_parse.AT_BEGINNING,
+    sre_parse.AT_BEGINNING_STRING,
+    sre_parse.AT_BOUNDARY,
+    sre_parse.AT_END,
+    sre_parse.AT_END_STRING,
+)
+
+NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+WORD_RE = re.compile(r"\w+")
+
+
+def literal_words(regex):
+    """
+    Find the words any string matched by the compiled regex must contain.
+
+    Only complete ASCII words spelled out literally at the top level of the
+    regex are returned, lowercased. A word is complete if it is delimited on
+    both sides by literal non-word characters or by anchors, so that it will
+    be found when splitting a matching sentence into words.
+    """
+
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:  # pylint:disable=broad-except
+        return ()
+
+    words = []
+    # None while the word being collected has no delimiter on the left
+    current = None
+
+    for opcode, argument in parsed:
+        if opcode is sre_parse.LITERAL and argument < 128:
+            char = chr(argument)
+            if char.isalnum() or char == "_":
+                if current is not None:
+                    current.append(char)
+                continue
+        elif not (opcode is sre_parse.AT and argument in WORD_BOUNDARIES):
+            current = None
+            continue
+
+        # A delimiter: non-word literal or an anchor
+        if current:
+            words.append("".join(current).lower())
+        current = []
+
+    return tuple(words)
+
+
 class PriorityClass(object):
     """
     Priority class constants.
@@ -57,6 +115,11 @@ class CallbackDict(dict):
         """
         super().__init__({what: {when: {} for when in HOOK_WHEN} for what in HOOK_WHAT})
 
+        # Incremented on every change to the callbacks
+        self.version = 0
+        # what -> (version, before hooks, combined around hook, after hooks)
+        self._composed = {}
+
     @classmethod
     def _function_id(cls, func):
         """
@@ -87,6 +150,7 @@ class CallbackDict(dict):
         funcs = self[what][when].setdefault(priority, OrderedDict())
         funcs.pop(name, None)
         funcs[name] = function
+        self.version += 1
 
     # pylint:enable=too-many-arguments
 
@@ -108,6 +172,8 @@ class CallbackDict(dict):
                     else:
                         callback_list.pop(name, None)
 
+        self.version += 1
+
     def hook_list(self, what, when):
         """
         Get all the hooks for a certain event, sorted appropriately.
@@ -116,17 +182,37 @@ class CallbackDict(dict):
             func for priority in sorted(self[what][when].keys()) for func in self[what][when][priority].values()
         )
 
+    def composed_hooks(self, what):
+        """
+        Get the hooks to run before, around (combined into one context
+        manager) and after a certain event. Coroutine functions are run in the
+        event loop.
+
+        The result is cached until the callbacks change.
+        """
+
+        try:
+            version, before_hooks, multi_hook, after_hooks = self._composed[what]
+            if version == self.version:
+                return before_hooks, multi_hook, after_hooks
+        except KeyError:
+            pass
+
+        before_hooks = tuple(synchronous(hook) for hook in self.hook_list(what, "before"))
+        multi_hook = multi_manager(*self.hook_list(what, "around"))
+        after_hooks = tuple(synchronous(hook) for hook in self.hook_list(what, "after"))
+
+        self._composed[what] = (self.version, before_hooks, multi_hook, after_hooks)
+
+        return before_hooks, multi_hook, after_hooks
+
     def wrap(self, what, function, *hook_args, **hook_kwargs):
         """
         Return a function that executes all the callbacks in proper relations
         to the given test part.
         """
 
-        before_hooks = self.hook_list(what, "before")
-        around_hooks = self.hook_list(what, "around")
-        after_hooks = self.hook_list(what, "after")
-
-        multi_hook = multi_manager(*around_hooks)
+        before_hooks, multi_hook, after_hooks = self.composed_hooks(what)
 
         @wraps(function)
         def wrapped(*args, **kwargs):
@@ -144,16 +230,28 @@ class CallbackDict(dict):
 
         return wrapped
 
+    def wrap_async(self, what, function, *hook_args, **hook_kwargs):
+        """
+        Return a coroutine function that executes all the callbacks in proper
+        relations to the given test part, awaiting the function and the
+        coroutine callbacks in the running event loop.
+        """
+
+        return awaiting_callbacks(
+            function,
+            self.hook_list(what, "before"),
+            self.hook_list(what, "around"),
+            self.hook_list(what, "after"),
+            hook_args,
+            hook_kwargs,
+        )
+
     def before_after(self, what):
         """
         Return a pair of functions to execute before and after the event.
         """
 
-        before_hooks = self.hook_list(what, "before")
-        around_hooks = self.hook_list(what, "around")
-        after_hooks = self.hook_list(what, "after")
-
-        multi_hook = multi_manager(*around_hooks)
+        before_hooks, multi_hook, after_hooks = self.composed_hooks(what)
 
         # Save in a closure for both functions
         around_hook = [None]
@@ -177,19 +275,46 @@ class CallbackDict(dict):
         return before_func, after_func
 
 
+MatchCacheInfo = namedtuple("MatchCacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+
 class StepDict(object):
     """
     A mapping of step sentences to their definitions.
+
+    Matching results are cached per sentence; at most `cache_size` most
+    recently matched sentences are kept.
     """
 
+    cache_size = 4096
+
     def __init__(self):
         self.steps = dict()
 
+        # sentence -> (function, args, kwargs, regex), least recently used
+        # first
+        self._match_cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # An index to only try the regexes that can possibly match a sentence:
+        # word -> patterns that require the word to be in the sentence, and
+        # the patterns for which no such word could be found
+        self._by_word = {}
+        self._word = {}
+        self._unindexed = set()
+        # Registration order of the patterns, to try them in
+        self._order = {}
+        self._counter = count()
+
     def load(self, sentence, func):
         """Add a mapping between a step sentence and a function."""
 
         step_re = self._assert_is_step(sentence, func)
+        self._remove_from_index(step_re.pattern, keep_order=True)
         self.steps[step_re.pattern] = (step_re, func)
+        self._add_to_index(step_re)
+        self._match_cache.clear()
 
         try:
             func.sentence = sentence
@@ -207,6 +332,9 @@ class StepDict(object):
             del self.steps[sentence]
         except KeyError:
             pass
+        else:
+            self._remove_from_index(sentence)
+            self._match_cache.clear()
 
     def unload_func(self, func):
         """Remove any mappings for a given function."""
@@ -214,10 +342,67 @@ class StepDict(object):
         sentences_to_remove = list(sentence for sentence, (_, step_func) in self.steps.items() if step_func == func)
         for sentence in sentences_to_remove:
             del self.steps[sentence]
+            self._remove_from_index(sentence)
+        if sentences_to_remove:
+            self._match_cache.clear()
 
     def clear(self):
         """Remove all registered steps."""
         self.steps.clear()
+        self._match_cache.clear()
+        self._by_word.clear()
+        self._word.clear()
+        self._unindexed.clear()
+        self._order.clear()
+
+    def _add_to_index(self, step_re):
+        """Index a newly loaded step regex."""
+
+        pattern = step_re.pattern
+
+        # Replacing a pattern keeps its place in the dictionary, and so must
+        # keep its place in the index
+        if pattern not in self._order:
+            self._order[pattern] = next(self._counter)
+
+        # The longest word is likely the rarest one
+        words = sorted(literal_words(step_re), key=len, reverse=True)
+        if words:
+            self._word[pattern] = words[0]
+            self._by_word.setdefault(words[0], set()).add(pattern)
+        else:
+            self._unindexed.add(pattern)
+
+    def _remove_from_index(self, pattern, keep_order=False):
+        """Remove a step regex from the index."""
+
+        if not keep_order:
+            self._order.pop(pattern, None)
+
+        self._unindexed.discard(pattern)
+        word = self._word.pop(pattern, None)
+        if word is not None:
+            patterns = self._by_word[word]
+            patterns.discard(pattern)
+            if not patterns:
+                del self._by_word[word]
+
+    def candidates(self, sentence):
+        """
+        The step regexes and functions which could match the sentence, in the
+        order they were registered.
+        """
+
+        # Case-insensitive matching can make non-ASCII characters match
+        # ASCII ones, only trust the index for ASCII sentences
+        if NON_ASCII_RE.search(sentence):
+            return list(self.steps.values())
+
+        patterns = set(self._unindexed)
+        for word in set(WORD_RE.findall(sentence.lower())):
+            patterns.update(self._by_word.get(word, ()))
+
+        return [self.steps[pattern] for pattern in sorted(patterns, key=self._order.__getitem__)]
 
     def __len__(self):
         """Number of registered step sentences."""
@@ -275,29 +460,114 @@ class StepDict(object):
 
         Returns a tuple of (function, args, kwargs).
         """
+
+        func, args, kwargs, _ = self._match_cached(step_.sentence)
+
+        # Don't let the callers modify the cached arguments
+        return (func, args, dict(kwargs))
+
+    def match_definition(self, step_):
+        """
+        Find a function and arguments to call for a specified Step, together
+        with the regex it was matched by.
+
+        Returns a tuple of (function, args, kwargs, regex), the regex being
+        None if the step is not defined.
+        """
+
+        func, args, kwargs, regex = self._match_cached(step_.sentence)
+
+        # Don't let the callers modify the cached arguments
+        return (func, args, dict(kwargs), regex)
+
+    def definition(self, step_):
+        """
+        Find the step definition for a specified Step.
+
+        Returns a tuple of (compiled regex, function), the regex being None
+        if the step is not defined.
+        """
+
+        func, _, _, regex = self._match_cached(step_.sentence)
+        return (regex, func)
+
+    def _match_cached(self, sentence):
+        """
+        Match a sentence using the cache.
+
+        Returns a tuple of (function, args, kwargs, regex).
+        """
+
+        try:
+            match = self._match_cache.pop(sentence)
+        except KeyError:
+            self.cache_misses += 1
+            match = self._match(sentence)
+        else:
+            self.cache_hits += 1
+
+        # Move the sentence to the most recently used end
+        self._match_cache[sentence] = match
+        while len(self._match_cache) > self.cache_size:
+            self._match_cache.popitem(last=False)
+
+        return match
+
+    def match_sentence(self, sentence):
+        """
+        Find a function and arguments to call for a step sentence, bypassing
+        the cache.
+
+        Returns a tuple of (function, args, kwargs).
+        """
+
+        func, args, kwargs, _ = self._match(sentence)
+        return (func, args, kwargs)
+
+    def _match(self, sentence):
+        """
+        Find the function, arguments and regex for a step sentence.
+
+        Returns a tuple of (function, args, kwargs, regex).
+        """
+
         # strip the first word which will be Given, Then, When or And
         # sentence = step_.sentence.split(' ', 1)[1]
         matched = None
         matched_func = None
-        matched_pos = len(step_.sentence)
+        matched_pos = len(sentence)
 
-        for regex, func in self.steps.values():
-            new_match = regex.search(step_.sentence)
+        # The last registered definition wins between matches at the same
+        # position
+        for regex, func in reversed(self.candidates(sentence)):
+            new_match = regex.search(sentence)
             if new_match:
                 pos = new_match.start(0)
                 if pos < matched_pos:
                     matched = new_match
                     matched_func = func
+                    matched_pos = pos
+                    if pos == 0:
+                        # Nothing can match further to the left
+                        break
 
         if matched:
             kwargs = matched.groupdict()
             if kwargs:
-                return (matched_func, (), matched.groupdict())
+                return (matched_func, (), matched.groupdict(), matched.re)
             else:
                 args = matched.groups()
-                return (matched_func, args, {})
+                return (matched_func, args, {}, matched.re)
+
+        return (undefined_step, (), {}, None)
+
+    def cache_info(self):
+        """
+        Statistics of the sentence matching cache, like those of
+        :func:`functools.lru_cache`.
+        """
 
-        return (undefined_step, (), {})
+        return MatchCacheInfo(self.cache_hits, self.cache_misses, self.cache_size, len(self._match_cache))
 
     def step(self, step_func_or_sentence):
         """
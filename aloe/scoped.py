@@ -0,0 +1,160 @@
+"""
+A world object scoped to the features and scenarios.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import copy
+import threading
+
+
+# Marks an attribute of an outer scope deleted in a scenario
+DELETED = object()
+
+
+class ScopedWorld(object):
+    """
+    Store arbitrary data, like :data:`aloe.world`, in three scopes:
+
+    * The attributes set outside of any feature, e.g. in ``before.all``
+      callbacks, are shared by all the threads.
+    * The attributes set while running a feature, e.g. in
+      ``before.each_feature`` callbacks, are kept until the end of the
+      feature. They are shared by the threads running the scenarios of the
+      feature.
+    * The attributes set while running a scenario, including its
+      ``before.each_example`` callbacks, are discarded when the scenario
+      finishes.
+
+    The scenario scopes are local to the thread running them, so scenarios
+    run concurrently don't see each other's changes. The attributes of the
+    outer scopes can be read in a scenario, but setting or deleting them only
+    affects the scenario.
+
+    If :attr:`snapshot` is set, an attribute of an outer scope is deep-copied
+    into the scenario the first time it is read there, so that changing it in
+    place (e.g. appending to a list) doesn't affect the other scenarios either.
+    Values that cannot be copied, such as locks or browser connections, are
+    shared.
+
+    The names of the methods and :attr:`snapshot` cannot be used for data.
+    """
+
+    __slots__ = ("snapshot", "_shared", "_features", "_latest", "_lock", "_local")
+
+    def __init__(self, snapshot=False):
+        object.__setattr__(self, "snapshot", snapshot)
+        object.__setattr__(self, "_shared", {})
+        # The scopes of the running features, by feature
+        object.__setattr__(self, "_features", {})
+        # The feature begun last, for the threads not running one
+        object.__setattr__(self, "_latest", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_local", threading.local())
+
+    def _scopes(self):
+        """The active scopes, innermost first."""
+
+        local = self._local
+        feature = self._features.get(getattr(local, "feature", self._latest))
+        return [scope for scope in (getattr(local, "scenario", None), feature, self._shared) if scope is not None]
+
+    def __getattr__(self, name):
+        scopes = self._scopes()
+
+        for scope in scopes:
+            try:
+                value = scope[name]
+            except KeyError:
+                continue
+
+            if value is DELETED:
+                break
+
+            scenario = getattr(self._local, "scenario", None)
+            if self.snapshot and scenario is not None and scope is not scenario:
+                try:
+                    value = copy.deepcopy(value)
+                except Exception:  # pylint:disable=broad-except
+                    pass
+                scenario[name] = value
+
+            return value
+
+        raise AttributeError("{!r} object has no attribute {!r}".format(type(self).__name__, name))
+
+    def __setattr__(self, name, value):
+        if name in self.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            self._scopes()[0][name] = value
+
+    def __delattr__(self, name):
+        if name in self.__slots__:
+            raise AttributeError("Cannot delete {!r}".format(name))
+
+        scopes = self._scopes()
+        if next((scope[name] for scope in scopes if name in scope), DELETED) is DELETED:
+            raise AttributeError(name)
+
+        innermost = scopes[0]
+        if any(name in scope for scope in scopes[1:]):
+            # Hide the outer value until the scope ends
+            innermost[name] = DELETED
+        else:
+            del innermost[name]
+
+    def __dir__(self):
+        names = set(dir(type(self)))
+        for scope in self._scopes():
+            names.update(name for name, value in scope.items() if value is not DELETED)
+        return sorted(names)
+
+    def begin_feature(self, feature=None):
+        """
+        Start the scope of a feature (any hashable key, e.g. its test class)
+        in the current thread. The threads starting a scenario of the same
+        feature share it.
+        """
+
+        with self._lock:
+            self._features[feature] = {}
+            object.__setattr__(self, "_latest", feature)
+        self._local.feature = feature
+
+    def end_feature(self, feature=None):
+        """Discard the attributes set in the feature."""
+
+        with self._lock:
+            self._features.pop(feature, None)
+            if self._latest == feature:
+                object.__setattr__(self, "_latest", None)
+        vars(self._local).pop("feature", None)
+
+    def begin_scenario(self, feature=None):
+        """
+        Start a scenario scope in the current thread, seeing the attributes
+        of the given feature (by default, the one begun in the current thread
+        or else the one begun last).
+        """
+
+        if feature is not None:
+            self._local.feature = feature
+        self._local.scenario = {}
+
+    def end_scenario(self):
+        """Discard the attributes set in the scenario."""
+        self._local.scenario = None
+
+    def clear(self):
+        """Remove all the attributes of all the scopes."""
+
+        self._shared.clear()
+        with self._lock:
+            self._features.clear()
+            object.__setattr__(self, "_latest", None)
+        self.end_scenario()
+        vars(self._local).pop("feature", None)
@@ -14,8 +14,25 @@ from builtins import zip
 
 # pylint:enable=redefined-builtin
 
+import re
 import unicodedata
 
+try:
+    is_ascii = str.isascii
+except AttributeError:  # Python < 3.7
+    NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
+    def is_ascii(string):
+        """Whether the string only has ASCII characters."""
+        return not NON_ASCII_RE.search(string)
+
+
+# The terminal widths of the East Asian width classes other than 1
+EAST_ASIAN_WIDTHS = {"W": 2, "F": 2}
+
+# The terminal width of each character seen so far
+CHAR_WIDTHS = {chr(code): 1 for code in range(128)}
+
 
 def represent_table(table, indent=0, cell_wrap=str):
     """
@@ -27,17 +44,33 @@ def represent_table(table, indent=0, cell_wrap=str):
     if not table:
         return ""
 
-    # calculate the width of each column
     table = [[str(cell).replace("|", r"\|") for cell in row] for row in table]
 
-    lengths = [max(get_terminal_width(cell) for cell in column) for column in zip(*table)]  # transpose
+    # calculate the width of each column
+    widths, lengths = measure_table(table)
 
     return "\n".join(
-        " " * indent + "| %s |" % " | ".join(cell_wrap(ljust(cell, length)) for cell, length in zip(row, lengths))
-        for row in table
+        " " * indent
+        + "| %s |"
+        % " | ".join(cell_wrap(cell + " " * (length - width)) for cell, width, length in zip(row, row_widths, lengths))
+        for row, row_widths in zip(table, widths)
     )
 
 
+def measure_table(table):
+    """
+    Measure the terminal width of every cell of a table (a list of rows of
+    strings) once.
+
+    Returns the widths of the cells, in rows, and the width of each column.
+    """
+
+    widths = [[get_terminal_width(cell) for cell in row] for row in table]
+    lengths = [max(column) for column in zip(*widths)]  # transpose
+
+    return widths, lengths
+
+
 def get_terminal_width(string):
     """
     Get the terminal width of a string
@@ -46,9 +79,18 @@ def get_terminal_width(string):
     will be displayed on a terminal, compensating for double-wide characters.
     """
 
-    widths = {"W": 2, "F": 2}
-
-    return sum(widths.get(unicodedata.east_asian_width(c), 1) for c in string)
+    if is_ascii(string):
+        return len(string)
+
+    try:
+        return sum(CHAR_WIDTHS[char] for char in string)
+    except KeyError:
+        CHAR_WIDTHS.update(
+            (char, EAST_ASIAN_WIDTHS.get(unicodedata.east_asian_width(char), 1))
+            for char in set(string)
+            if char not in CHAR_WIDTHS
+        )
+        return sum(CHAR_WIDTHS[char] for char in string)
 
 
 def ljust(string, width):
@@ -0,0 +1,143 @@
+"""
+Selecting scenarios by their tags.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import re
+
+
+TOKEN_RE = re.compile(r"[(),~]|[^\s(),~]+")
+
+
+class TagExpression(object):
+    """
+    Cucumber-style tag expressions selecting the scenarios to run.
+
+    Supports ``and``, ``or``, ``not`` and parentheses, e.g.
+    ``@smoke and not (@slow or @wip)``, as well as the older syntax where
+    ``~@slow`` excludes a tag and ``@smoke,@wip`` selects either tag. When
+    several expressions are given, a scenario must match all of them. The
+    ``@`` in front of the tags is optional.
+    """
+
+    def __init__(self, *expressions):
+        self.expressions = tuple(expression for expression in expressions if expression.strip())
+        self.matchers = tuple(ExpressionParser(expression).parse() for expression in self.expressions)
+
+    def __bool__(self):
+        """Whether there are any expressions to filter by."""
+        return bool(self.matchers)
+
+    __nonzero__ = __bool__
+
+    def __str__(self):
+        return " and ".join("({})".format(expression) for expression in self.expressions)
+
+    def matches(self, tags):
+        """Whether a scenario with the given tags is selected."""
+
+        tags = frozenset(tags)
+        return all(matcher(tags) for matcher in self.matchers)
+
+
+class ExpressionParser(object):
+    """
+    A recursive descent parser turning a tag expression into a function of the
+    set of tags.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = TOKEN_RE.findall(expression)
+        self.position = 0
+
+    def error(self, message):
+        """An error in the expression."""
+        return ValueError("Invalid tag expression {!r}: {}".format(self.expression, message))
+
+    def peek(self):
+        """The next token, lowercased, or None at the end of the expression."""
+
+        try:
+            return self.tokens[self.position].lower()
+        except IndexError:
+            return None
+
+    def take(self):
+        """Consume the next token."""
+
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        """Parse the whole expression."""
+
+        matcher = self.parse_or()
+
+        if self.peek() is not None:
+            raise self.error("unexpected {!r}".format(self.take()))
+
+        return matcher
+
+    def parse_or(self):
+        """Parse alternatives separated by 'or' or a comma."""
+
+        alternatives = [self.parse_and()]
+        while self.peek() in ("or", ","):
+            self.take()
+            alternatives.append(self.parse_and())
+
+        if len(alternatives) == 1:
+            return alternatives[0]
+
+        return lambda tags: any(alternative(tags) for alternative in alternatives)
+
+    def parse_and(self):
+        """Parse conditions separated by 'and'."""
+
+        conditions = [self.parse_not()]
+        while self.peek() == "and":
+            self.take()
+            conditions.append(self.parse_not())
+
+        if len(conditions) == 1:
+            return conditions[0]
+
+        return lambda tags: all(condition(tags) for condition in conditions)
+
+    def parse_not(self):
+        """Parse a possibly negated tag or parenthesized expression."""
+
+        token = self.peek()
+
+        if token is None:
+            raise self.error("unexpected end")
+
+        if token in ("not", "~"):
+            self.take()
+            negated = self.parse_not()
+            return lambda tags: not negated(tags)
+
+        if token == "(":
+            self.take()
+            matcher = self.parse_or()
+            if self.peek() != ")":
+                raise self.error("missing ')'")
+            self.take()
+            return matcher
+
+        if token in ("and", "or", ",", ")"):
+            raise self.error("unexpected {!r}".format(self.take()))
+
+        tag = self.take()
+        if tag.startswith("@"):
+            tag = tag[1:]
+        if not tag:
+            raise self.error("empty tag")
+
+        return lambda tags: tag in tags
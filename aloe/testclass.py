@@ -15,14 +15,17 @@ from builtins import super
 
 # pylint:enable=redefined-builtin
 
-import ast
 import unittest
+import weakref
 import pytest
 from contextlib import contextmanager
+from functools import partial, wraps
 
-from .codegen import make_function
+from . import scoped_world
+from .asynchronous import EVENT_LOOP_RUNNER, synchronous
+from .codegen import make_function, relocate_traceback
 from .fs import path_to_module_name
-from .parser import Background, Feature, Scenario, Step
+from .parser import Background, Feature, Outline, Scenario, Step
 from .registry import CallbackDecorator, CALLBACK_REGISTRY, PriorityClass, STEP_REGISTRY
 from .utils import identifier, get_args
 
@@ -32,6 +35,10 @@ class TestStep(Step):
     A step with additional functions for the callbacks.
     """
 
+    # test is the test currently running the step, or None if not currently in
+    # a test (e.g. in a `before_feature` callback)
+    __slots__ = ("test", "failed", "passed", "definition")
+
     @property
     def testclass(self):
         """
@@ -39,16 +46,13 @@ class TestStep(Step):
         """
         return self.feature.testclass
 
-    test = None
-    """
-    The test currently running the step, or None if not currently in a test
-    (e.g. in a `before_feature` callback).
-    """
-
     def __init__(self, *args, **kwargs):
         """Initialize the step status."""
+        self.test = None
         self.failed = None
         self.passed = None
+        # The (regex, function) the step was matched with when prepared
+        self.definition = None
         super().__init__(*args, **kwargs)
 
     def behave_as(self, string):
@@ -67,22 +71,99 @@ class TestStep(Step):
         """Run the specified 'Then' step in the current context."""
         self.behave_as(self.step_keyword("then") + string)
 
+    def behave_as_async(self, string):
+        """
+        Run the specified step in the current context from a coroutine step.
+        Returns an awaitable.
+        """
+        return self.test.behave_as_async(self, string)
+
+    def given_async(self, string):
+        """Run the specified 'Given' step from a coroutine step."""
+        return self.behave_as_async(self.step_keyword("given") + string)
+
+    def when_async(self, string):
+        """Run the specified 'When' step from a coroutine step."""
+        return self.behave_as_async(self.step_keyword("when") + string)
+
+    def then_async(self, string):
+        """Run the specified 'Then' step from a coroutine step."""
+        return self.behave_as_async(self.step_keyword("then") + string)
+
+
+class BindingPlan(object):
+    """
+    How to pass the fixtures and the captured groups to a step function.
+
+    The parameters of the step function (except the step itself) are filled,
+    in order, with the fixtures of the same name, then the named groups, then
+    the unnamed groups in the order they were captured.
+    """
+
+    # Parameters of the step functions seen so far
+    _params_cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, func, kwargs):
+        self.params = self.parameters(func)
+        self.named = frozenset(kwargs)
+
+    @classmethod
+    def parameters(cls, func):
+        """The names of the parameters to fill for a step function."""
+
+        try:
+            return cls._params_cache[func]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable or not weakly referenceable
+            return tuple(arg for arg in get_args(func) if arg != "self")
+
+        params = cls._params_cache[func] = tuple(arg for arg in get_args(func) if arg != "self")
+        return params
+
+    def bind(self, request, args, kwargs):
+        """
+        Return the keyword arguments to call the step function with, given the
+        pytest request for the fixtures and the captured groups.
+        """
+
+        fixtures = request._fixturemanager._arg2fixturedefs if request else ()
+
+        kwargs = dict(kwargs)
+        captured = []
+        for param in self.params:
+            if param in fixtures:
+                kwargs[param] = request.getfixturevalue(param)
+            elif param not in self.named:
+                captured.append(param)
+
+        kwargs.update(zip(captured, args))
+
+        return kwargs
+
 
 class TestBackground(Background):
     """A background creating steps for testing."""
 
+    __slots__ = ()
+
     step_class = TestStep
 
 
 class TestScenario(Scenario):
     """A background creating steps for testing."""
 
+    __slots__ = ()
+
     step_class = TestStep
 
 
 class TestFeature(Feature):
     """A feature creating steps for testing."""
 
+    __slots__ = ()
+
     background_class = TestBackground
     scenario_class = TestScenario
 
@@ -93,7 +174,20 @@ class TestCase(unittest.TestCase):
     """
 
     feature = None  # Will be supplied when constructing derived classes
-    functions = []
+
+    functions = {}
+    """
+    The pytest items of the collected scenarios, by test method name. Each
+    generated class has its own mapping.
+    """
+
+    step_runner = "compiled"
+    """
+    How the generated methods run the steps: 'compiled' compiles a function
+    with the step calls at the lines of the feature file, 'closure' loops over
+    the matched steps, which costs nothing to build, and rewrites the
+    tracebacks to point to the lines of the feature file.
+    """
 
     @classmethod
     def before_feature(cls, feature):
@@ -108,11 +202,15 @@ class TestCase(unittest.TestCase):
     # Methods for the use of the tested code
     @classmethod
     def setUpClass(cls):
+        scoped_world.begin_feature(cls)
         cls.before_feature(cls.feature)
 
     @classmethod
     def tearDownClass(cls):
-        cls.after_feature(cls.feature)
+        try:
+            cls.after_feature(cls.feature)
+        finally:
+            scoped_world.end_feature(cls)
 
     def behave_as(self, context_step, string):
         """
@@ -120,6 +218,31 @@ class TestCase(unittest.TestCase):
         step.
         """
 
+        for step in self.steps_in_context(context_step, string):
+            definition = self.prepare_step(step)
+
+            definition["func"](definition["step"], *definition["args"], **definition["kwargs"])
+
+    async def behave_as_async(self, context_step, string):
+        """
+        Run the steps described by the given string in the context of the
+        step, from a coroutine step. The steps and the coroutine callbacks
+        are awaited in the running event loop.
+        """
+
+        for step in self.steps_in_context(context_step, string):
+            func, args, kwargs, regex = STEP_REGISTRY.match_definition(step)
+            step.definition = (regex, func)
+            func = CALLBACK_REGISTRY.wrap_async("step", func, step)
+
+            await func(step, *args, **kwargs)
+
+    def steps_in_context(self, context_step, string):
+        """
+        Parse the steps described by the given string to run in the context
+        of the step.
+        """
+
         steps = context_step.parse_steps_from_string(string)
 
         # Copy necessary attributes onto new steps
@@ -131,9 +254,7 @@ class TestCase(unittest.TestCase):
             except AttributeError:
                 step.background = context_step.background
 
-            definition = self.prepare_step(step)
-
-            definition["func"](definition["step"], *definition["args"], **definition["kwargs"])
+        return steps
 
     def shortDescription(self):
         return str(self)
@@ -149,16 +270,36 @@ class TestCase(unittest.TestCase):
     # Methods for generating test classes
 
     @classmethod
-    def from_file(cls, file_):
+    def from_file(cls, file_, lazy=False, tags=None, indices=None, step_runner=None):
         """
         Construct a test class from a feature file.
+
+        If lazy is set, the steps of each scenario are only matched and the
+        code running them is only generated when the scenario is first run.
+
+        If step_runner is given, it overrides :attr:`step_runner` of the class.
+
+        If tags (a :class:`aloe.tags.TagExpression`) are given, only the
+        scenarios matching them are generated. Likewise, if indices (1-based
+        positions of the scenarios in the file) are given, only the scenarios
+        at these positions are generated.
         """
 
+        if step_runner is not None and step_runner != cls.step_runner:
+            cls = type(cls.__name__, (cls,), {"__module__": cls.__module__, "step_runner": step_runner})
+
         feature = TestFeature.from_file(file_)
 
-        background = cls.make_background(feature.background)
+        selected = [
+            (i + 1, scenario)
+            for i, scenario in enumerate(feature.scenarios)
+            if (not indices or i + 1 in indices) and (not tags or tags.matches(scenario.tags))
+        ]
+
+        # Don't bother with the background if there is nothing to run
+        background = cls.make_background(feature.background if selected else None, lazy=lazy)
         scenarios = [
-            example for i, scenario in enumerate(feature.scenarios) for example in cls.make_examples(scenario, i + 1)
+            example for index, scenario in selected for example in cls.make_examples(scenario, index, lazy=lazy)
         ]
 
         before_feature, after_feature = CALLBACK_REGISTRY.before_after("feature")
@@ -166,6 +307,7 @@ class TestCase(unittest.TestCase):
         members = {
             "feature": feature,
             "background": background,
+            "functions": {},
             "before_feature": staticmethod(before_feature),
             "after_feature": staticmethod(after_feature),
         }
@@ -180,54 +322,130 @@ class TestCase(unittest.TestCase):
         return testclass
 
     @classmethod
-    def make_background(cls, background):
+    def make_background(cls, background, lazy=False):
         """
         Construct a method running the background steps.
         """
 
         if background is None:
             result = make_function("def background(self): pass")
+        elif lazy:
+            result = cls.make_lazy(
+                lambda: cls.make_steps(background, background.steps, is_background=True), name="background"
+            )
         else:
             result = cls.make_steps(background, background.steps, is_background=True)
 
         return result
 
     @classmethod
-    def make_examples(cls, scenario, index):
+    def make_examples(cls, scenario, index, lazy=False):
         """
         Construct methods for running all the examples of a scenario.
 
         index is the 1-based number of the scenario in the feature.
         """
 
-        if scenario.outlines:
-            for i, (outline, steps) in enumerate(scenario.evaluated, 1):
-                # Create a function calling the real scenario example to show
-                # the right location in the outline
-                source = """
-def run_example(self):
-    outline(self)
-                """
-                source = ast.parse(source)
-
-                # Set location of the call
-                for node in ast.walk(source.body[0].body[0]):
-                    node.lineno = outline.line
-
-                context = {"outline": cls.make_steps(scenario, steps, is_background=False, outline=outline)}
-
-                yield cls.make_example(
-                    make_function(
-                        source=source,
-                        context=context,
-                        source_file=scenario.feature.filename,
-                        name="{}: Example {}".format(scenario.name, i),
-                    ),
-                    scenario,
-                    index,
+        if scenario.outline_rows and lazy:
+            # Only keep the compact rows until the examples are run
+            for i, row in enumerate(scenario.outline_rows, 1):
+                method = cls.make_lazy(
+                    partial(cls.make_row_example, scenario, row, i), name=cls.outline_example_name(scenario, i)
                 )
+
+                yield cls.make_example(method, scenario, index)
+        elif scenario.outline_rows:
+            for i, outline in enumerate(scenario.outlines, 1):
+                method = cls.make_outline_example(scenario, outline, i)
+
+                yield cls.make_example(method, scenario, index)
         else:
-            yield cls.make_example(cls.make_steps(scenario, scenario.steps, is_background=False), scenario, index)
+            if lazy:
+                method = cls.make_lazy(
+                    lambda: cls.make_steps(scenario, scenario.steps, is_background=False), name=scenario.name
+                )
+            else:
+                method = cls.make_steps(scenario, scenario.steps, is_background=False)
+
+            yield cls.make_example(method, scenario, index)
+
+    @staticmethod
+    def outline_example_name(scenario, index):
+        """
+        The name of the method running the index-th (1-based) example of a
+        scenario outline.
+        """
+
+        return "{}: Example {}".format(scenario.name, index)
+
+    @classmethod
+    def make_outline_example(cls, scenario, outline, index):
+        """
+        Construct a method running an example of a scenario outline.
+        """
+
+        # Create a function calling the real scenario example to show
+        # the right location in the outline
+        source = """
+def run_example(self):
+    outline(self)
+        """
+
+        steps = scenario.evaluate(outline)
+        context = {"outline": cls.make_steps(scenario, steps, is_background=False, outline=outline)}
+        name = cls.outline_example_name(scenario, index)
+
+        if cls.step_runner == "closure":
+            return call_at(context["outline"], scenario.feature.filename, outline.line, name)
+
+        return make_function(
+            source=source,
+            context=context,
+            source_file=scenario.feature.filename,
+            name=name,
+            # Set location of the call
+            statement_lines=(outline.line,),
+        )
+
+    @classmethod
+    def make_row_example(cls, scenario, row, index):
+        """
+        Construct a method running an example of a scenario outline from its
+        :class:`aloe.parser.OutlineRow`.
+        """
+
+        return cls.make_outline_example(scenario, Outline.from_row(row), index)
+
+    @staticmethod
+    def make_lazy(make_method, name):
+        """
+        Construct a method which calls make_method() to construct the real
+        method when it is first called, and then delegates to it.
+
+        The real method can be dropped with the release() attribute of the
+        constructed one to free the memory once the scenario has run.
+        """
+
+        def run_lazily(self):
+            """Construct the real method if needed and run it."""
+
+            # Once constructed, the real method is also used by pytest to
+            # start the tracebacks in the feature file
+            try:
+                method = run_lazily.__wrapped__
+            except AttributeError:
+                method = run_lazily.__wrapped__ = make_method()
+
+            return method(self)
+
+        def release():
+            """Forget the real method until the next call."""
+            run_lazily.__dict__.pop("__wrapped__", None)
+
+        run_lazily.__name__ = identifier(name)
+        run_lazily.release = release
+
+        return run_lazily
 
     @classmethod
     def make_example(cls, method, scenario, index):
@@ -255,16 +473,19 @@ def run_example(self):
         """
         Find a definition for the step.
 
-        Returns a dictionary of: step, func, args, kwargs, where:
+        Returns a dictionary of: step, func, args, kwargs, plan, where:
         - step is the original step
         - func is the function to run (wrapped in callbacks)
         - args and kwargs are the arguments to pass to the function
+        - plan is the BindingPlan to combine the arguments with the fixtures
         """
 
-        func, args, kwargs = STEP_REGISTRY.match_step(step)
-        func = CALLBACK_REGISTRY.wrap("step", func, step)
+        func, args, kwargs, regex = STEP_REGISTRY.match_definition(step)
+        step.definition = (regex, func)
+        plan = BindingPlan(func, kwargs)
+        func = CALLBACK_REGISTRY.wrap("step", synchronous(func), step)
 
-        return {"step": step, "func": func, "args": args, "kwargs": kwargs}
+        return {"step": step, "func": func, "args": args, "kwargs": kwargs, "plan": plan}
 
     @classmethod
     def make_steps(cls, step_container, steps, is_background, outline=None):
@@ -280,6 +501,35 @@ def run_example(self):
 
         step_definitions = [cls.prepare_step(step) for step in steps]
 
+        if is_background:
+            func_name = "background"
+        else:
+            func_name = step_container.name
+
+        if cls.step_runner == "closure":
+            run_steps = cls.make_step_loop(step_container, step_definitions, is_background, func_name)
+        else:
+            run_steps = cls.make_compiled_steps(step_container, step_definitions, is_background, func_name)
+
+        if not is_background:
+            run_steps = CALLBACK_REGISTRY.wrap("example", run_steps, step_container, outline, steps)
+            run_steps = scenario_scoped(run_steps)
+            if step_container.tags:
+                for tag in list(step_container.tags):
+                    if tag not in pytest.mark._markers:
+                        pytest.mark._markers.add(tag)
+                    decorator = pytest.mark.__getattr__(tag)
+                    run_steps = decorator(run_steps)
+
+        return run_steps
+
+    @classmethod
+    def make_compiled_steps(cls, step_container, step_definitions, is_background, func_name):
+        """
+        Compile a function calling the prepared steps, with the calls located
+        at the lines of the steps.
+        """
+
         source = "def run_steps(self):\n"
         if not is_background:
             source += "    self.background()\n"
@@ -289,8 +539,8 @@ def run_example(self):
             """
     try:
         step{i}.test = self
-        args, kwargs = self._composekwargs(self.getFunctionRequest(self._testMethodName), func{i}, args{i}, kwargs{i})
-        func{i}(step{i}, *args, **kwargs)
+        kwargs = plan{i}.bind(self.getFunctionRequest(self._testMethodName), args{i}, kwargs{i})
+        func{i}(step{i}, **kwargs)
     finally:
         step{i}.test = None
             """.format(
@@ -298,36 +548,57 @@ def run_example(self):
             )
             for i in range(len(step_definitions))
         )
-        source = ast.parse(source)
 
         # Set locations of the steps
-        step_source = source.body[0].body
+        statement_lines = [definition["step"].line for definition in step_definitions]
         if not is_background:
             # There is no source for the background() call
-            step_source = step_source[1:]
-        for step, step_call in zip(steps, step_source):
-            for node in ast.walk(step_call):
-                node.lineno = step.line
+            statement_lines.insert(0, None)
 
         # Supply all the step functions and arguments
         context = {k + str(i): v for i, definition in enumerate(step_definitions) for k, v in definition.items()}
 
-        if is_background:
-            func_name = "background"
-        else:
-            func_name = step_container.name
+        return make_function(
+            source=source,
+            context=context,
+            source_file=step_container.filename,
+            name=func_name,
+            statement_lines=statement_lines,
+        )
 
-        run_steps = make_function(source=source, context=context, source_file=step_container.filename, name=func_name)
+    @classmethod
+    def make_step_loop(cls, step_container, step_definitions, is_background, func_name):
+        """
+        Construct a function calling the prepared steps in a loop. The
+        tracebacks of the step failures are rewritten to start at the lines
+        of the steps.
+        """
 
-        if not is_background:
-            run_steps = CALLBACK_REGISTRY.wrap("example", run_steps, step_container, outline, steps)
-            if step_container.tags:
-                for tag in list(step_container.tags):
-                    if tag not in pytest.mark._markers:
-                        pytest.mark._markers.add(tag)
-                    decorator = pytest.mark.__getattr__(tag)
-                    run_steps = decorator(run_steps)
+        definitions = tuple(
+            (definition["step"], definition["func"], definition["plan"], definition["args"], definition["kwargs"])
+            for definition in step_definitions
+        )
+        filename = step_container.filename
+
+        def run_steps(self):
+            """Run the steps."""
+
+            __tracebackhide__ = True  # pylint:disable=unused-variable
+
+            if not is_background:
+                self.background()
 
+            request = self.getFunctionRequest(self._testMethodName)
+            for step, func, plan, args, kwargs in definitions:
+                try:
+                    step.test = self
+                    func(step, **plan.bind(request, args, kwargs))
+                except BaseException as ex:
+                    raise ex.with_traceback(relocate_traceback(ex.__traceback__, filename, step.line, func_name))
+                finally:
+                    step.test = None
+
+        run_steps.__name__ = identifier(func_name)
         return run_steps
 
     @classmethod
@@ -345,30 +616,55 @@ def run_example(self):
 
     @staticmethod
     def _composekwargs(request, step_func, step_args, step_kwargs):
-        kwargs = {}
-        all_args = [arg for arg in get_args(step_func) if arg != "self"]
-        all_fixture_args = list(request._fixturemanager._arg2fixturedefs.keys()) if request else []
-        # fill all fixture arguments and add it to existing step_kwargs
-        step_fixture_args = [arg for arg in all_args if arg in all_fixture_args]
+        return (), BindingPlan(step_func, step_kwargs).bind(request, step_args, step_kwargs)
 
-        # Python > 3.5
-        kwargs = {**step_kwargs, **dict((arg, request.getfixturevalue(arg)) for arg in step_fixture_args)}
+    @classmethod
+    def getFunctionRequest(cls, function_name):
+        # pytest replaces the request of an item every time it runs
+        function = cls.functions.get(function_name)
+        if function is not None:
+            return function._request or None
 
-        # identity what arguments left and fill them from step arguments
-        filled_args = kwargs.keys()
-        left_over_args = [arg for arg in all_args if arg not in filled_args]
 
-        # Python > 3.5
-        kwargs = {**kwargs, **dict((arg, value) for arg, value in zip(left_over_args, step_args))}
+def call_at(function, filename, line, name):
+    """
+    A method calling the function with the call located at the given line in
+    the tracebacks.
+    """
 
-        return (), kwargs
+    def called_at(self):
+        """Call the function."""
 
-    @classmethod
-    def getFunctionRequest(cls, function_name):
-        for function in cls.functions:
-            if function._request:
-                if function_name == function._request.node.name:
-                    return function._request
+        __tracebackhide__ = True  # pylint:disable=unused-variable
+
+        try:
+            return function(self)
+        except BaseException as ex:
+            raise ex.with_traceback(relocate_traceback(ex.__traceback__, filename, line, name))
+
+    called_at.__name__ = identifier(name)
+    return called_at
+
+
+def scenario_scoped(function):
+    """
+    Run the function, including the example callbacks, in a new scenario scope
+    of :data:`aloe.scoped_world` and, unless it is shared by the session, a new
+    event loop.
+    """
+
+    @wraps(function)
+    def wrapped(self, *args, **kwargs):
+        """Discard the scenario attributes of the world afterwards."""
+        scoped_world.begin_scenario(type(self))
+        EVENT_LOOP_RUNNER.begin_scenario()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            EVENT_LOOP_RUNNER.end_scenario()
+            scoped_world.end_scenario()
+
+    return wrapped
 
 
 # A decorator to add callbacks which wrap the steps tighter than all the user
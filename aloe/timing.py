@@ -0,0 +1,284 @@
+"""
+Timing the steps.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import io
+import json
+import math
+import os
+import unittest
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from time import time as perf_counter
+
+import pytest
+
+from aloe.registry import CALLBACK_REGISTRY, PriorityClass, STEP_REGISTRY
+
+
+class StepDefinition(namedtuple("StepDefinition", ("function", "pattern"))):
+    """A step function together with the sentence regex it was matched by."""
+
+    __slots__ = ()
+
+    @property
+    def where(self):
+        """The name and the location of the step function."""
+
+        try:
+            code = self.function.__code__
+        except AttributeError:
+            return getattr(self.function, "__name__", repr(self.function))
+        else:
+            return "{} at {}:{}".format(code.co_name, os.path.relpath(code.co_filename), code.co_firstlineno)
+
+    def __str__(self):
+        return "{} ({})".format(self.pattern, self.where)
+
+
+class ReportedStepDefinition(namedtuple("ReportedStepDefinition", ("pattern", "where"))):
+    """A step definition timed in another process, e.g. an xdist worker."""
+
+    __slots__ = ()
+
+    __str__ = StepDefinition.__str__
+
+
+StepTimingStats = namedtuple("StepTimingStats", ("key", "count", "total", "p50", "p95", "max"))
+
+
+def percentile(durations, fraction):
+    """The nearest-rank percentile of sorted durations."""
+
+    return durations[max(0, int(math.ceil(fraction * len(durations))) - 1)]
+
+
+def step_outcome(exception):
+    """The outcome of a step which raised the given exception (or None)."""
+
+    if exception is None:
+        return "passed"
+    elif isinstance(exception, (unittest.SkipTest, pytest.skip.Exception)):
+        return "skipped"
+    else:
+        return "failed"
+
+
+class StepTimingHook(object):
+    """
+    Time every step run and pass the results to :meth:`record`.
+
+    Once installed, the hook wraps the step functions tighter than all the
+    user callbacks, so only the step itself is timed. Steps run with
+    behave_as() are timed too, and their time is included in the step
+    calling them.
+    """
+
+    priority = (PriorityClass.SYSTEM_INNER, 10)
+
+    @property
+    def hook_name(self):
+        """The name of the callback, unique to the hook."""
+        return "{}.{}-{}".format(type(self).__module__, type(self).__name__, id(self))
+
+    def install(self, registry=CALLBACK_REGISTRY):
+        """Start timing the steps."""
+        registry.append_to("step", "around", self.around_step, name=self.hook_name, priority=self.priority)
+
+    def uninstall(self, registry=CALLBACK_REGISTRY):
+        """Stop timing the steps."""
+        registry.clear(name=self.hook_name)
+
+    @contextmanager
+    def around_step(self, step):
+        """Time a step."""
+
+        start = perf_counter()
+        try:
+            yield
+        except BaseException as ex:
+            self.record(step, perf_counter() - start, step_outcome(ex))
+            raise
+        else:
+            self.record(step, perf_counter() - start, "passed")
+
+    def record(self, step, duration, outcome):
+        """
+        Record the duration of a step run, in seconds, and its outcome:
+        'passed', 'failed' or 'skipped'.
+        """
+
+        raise NotImplementedError()
+
+    @staticmethod
+    def definition(step):
+        """
+        The :class:`StepDefinition` of a step, as matched when the step was
+        prepared to run.
+        """
+
+        definition = getattr(step, "definition", None)
+        if definition is None:
+            definition = STEP_REGISTRY.definition(step)
+
+        regex, func = definition
+        return StepDefinition(func, regex.pattern if regex is not None else None)
+
+
+class StepTimer(StepTimingHook):
+    """
+    Collect the durations of the steps by step definition and by location in
+    the feature files, to find the slowest ones.
+    """
+
+    def __init__(self):
+        # StepDefinition -> durations
+        self.by_definition = {}
+        # (filename, line) -> durations
+        self.by_location = {}
+
+    def record(self, step, duration, outcome):
+        for durations, key in (
+            (self.by_definition, self.definition(step)),
+            (self.by_location, (step.filename, step.line)),
+        ):
+            try:
+                durations[key].append(duration)
+            except KeyError:
+                durations[key] = array("d", (duration,))
+
+    def export(self):
+        """
+        The recorded durations as basic types, to send them to another
+        process (see :meth:`merge`).
+        """
+
+        return {
+            "definitions": [
+                (definition.pattern, definition.where, list(durations))
+                for definition, durations in self.by_definition.items()
+            ],
+            "locations": [
+                (filename, line, list(durations)) for (filename, line), durations in self.by_location.items()
+            ],
+        }
+
+    def merge(self, exported):
+        """Add the durations recorded by another timer (see :meth:`export`)."""
+
+        for pattern, where, durations in exported["definitions"]:
+            self.by_definition.setdefault(ReportedStepDefinition(pattern, where), array("d")).extend(durations)
+        for filename, line, durations in exported["locations"]:
+            self.by_location.setdefault((filename, line), array("d")).extend(durations)
+
+    def slowest(self, count=None, by="definition"):
+        """
+        Statistics for the steps taking the most time in total, by
+        'definition' or 'location', as a list of :class:`StepTimingStats`.
+
+        If count is given, only that many are returned.
+        """
+
+        recorded = self.by_definition if by == "definition" else self.by_location
+
+        stats = []
+        for key, durations in recorded.items():
+            durations = sorted(durations)
+            stats.append(
+                StepTimingStats(
+                    key=key,
+                    count=len(durations),
+                    total=math.fsum(durations),
+                    p50=percentile(durations, 0.5),
+                    p95=percentile(durations, 0.95),
+                    max=durations[-1],
+                )
+            )
+
+        stats.sort(key=lambda stat: stat.total, reverse=True)
+        return stats[:count] if count else stats
+
+    def summary(self, count=None):
+        """The lines of a table of the slowest step definitions."""
+
+        lines = ["{:>10} {:>7} {:>9} {:>9} {:>9}  {}".format("total", "count", "p50", "p95", "max", "definition")]
+        lines.extend(
+            "{0.total:>9.3f}s {0.count:>7} {0.p50:>8.3f}s {0.p95:>8.3f}s {0.max:>8.3f}s  {0.key}".format(stat)
+            for stat in self.slowest(count)
+        )
+        return lines
+
+
+class StepTimingWriter(StepTimingHook):
+    """
+    Write a JSON Lines record for every step run to a file.
+
+    Each record has the feature file, line, sentence, step definition
+    pattern and function, duration in seconds, outcome and worker (if given,
+    e.g. the xdist worker id).
+
+    The records are kept in memory and only serialized and written, appending
+    to the file, every `buffer_size` records and when the writer is closed.
+    Each batch is written at once (unless the system only accepts a part of
+    it, then the rest is written next), so that several processes can write
+    to the same file.
+    """
+
+    buffer_size = 1000
+
+    def __init__(self, filename, worker=None):
+        self.filename = filename
+        self.worker = worker
+        self.buffer = []
+        self.file = io.open(filename, "ab", buffering=0)
+
+    def record(self, step, duration, outcome):
+        self.buffer.append((step.filename, step.line, step.sentence, self.definition(step), duration, outcome))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records to the file."""
+
+        if not self.buffer:
+            return
+
+        records, self.buffer = self.buffer, []
+
+        lines = "".join(
+            json.dumps(
+                {
+                    "feature": filename and os.path.relpath(filename),
+                    "line": line,
+                    "sentence": sentence,
+                    "definition": definition.pattern,
+                    "function": definition.where,
+                    "duration": duration,
+                    "outcome": outcome,
+                    "worker": self.worker,
+                },
+                sort_keys=True,
+            )
+            + "\n"
+            for filename, line, sentence, definition, duration, outcome in records
+        )
+        # The unbuffered file can write only a part of the data at a time
+        data = memoryview(lines.encode("utf-8"))
+        while data:
+            data = data[self.file.write(data) :]
+
+    def close(self):
+        """Write the remaining records and close the file."""
+
+        self.flush()
+        self.file.close()
@@ -1,3 +1,3 @@
 __version__ = "0.3.3"
 
-from aloe import after, around, before, step, world
+from aloe import after, around, before, scoped_world, step, world
@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 
 import os
+from functools import partial
 
 import pytest
+from aloe.asynchronous import EVENT_LOOP_RUNNER, EventLoopRunner
+from aloe.cache import FeatureCache, ParallelFeatureParser, find_features
+from aloe.parser import Feature as ParsedFeature
+from aloe.profiling import CollectionProfiler
 from aloe.testclass import TestCase, TestScenario
 from aloe.registry import CALLBACK_REGISTRY
+from aloe.tags import TagExpression
+from aloe.timing import StepTimer, StepTimingWriter
+from pytest_eucalyptus.scheduling import DurationRecorder, make_scheduler
 from gherkin.parser import Parser
 from pytest import Collector, File, Item
 from _pytest.unittest import TestCaseFunction, UnitTestCase
@@ -15,7 +23,14 @@ import sys
 
 def pytest_addoption(parser):
     group = parser.getgroup("pytest-aloe")
-    group.addoption("--tags", action="store", dest="tags", default="", help="Set tags to run.")
+    group.addoption(
+        "--tags",
+        action="append",
+        dest="tags",
+        default=[],
+        help="Only run scenarios matching the tag expression, e.g. '@wip and not @slow' or '~@slow'. "
+        "Can be given several times to require all the expressions to match.",
+    )
 
     test_class_name = "{c.__module__}.{c.__name__}".format(c=TestCase)
 
@@ -34,10 +49,216 @@ def pytest_addoption(parser):
         default="",
         help="Only run scenarios with these indices (comma-separated)",
     )
+    group.addoption(
+        "--aloe-lazy",
+        action="store_true",
+        dest="aloe_lazy",
+        default=False,
+        help="Only match the steps and generate the code of each scenario when it is run",
+    )
+    group.addoption(
+        "--aloe-step-runner",
+        action="store",
+        dest="aloe_step_runner",
+        choices=("compiled", "closure"),
+        default=None,
+        help="Run the steps of each scenario from a compiled function (the default of the test class), "
+        "or in a loop which is cheaper to build",
+    )
+    group.addoption(
+        "--aloe-parse-cache",
+        action="store_true",
+        dest="aloe_parse_cache",
+        default=False,
+        help="Keep parsed feature files in the pytest cache between runs",
+    )
+    group.addoption(
+        "--aloe-parse-workers",
+        action="store",
+        type=int,
+        dest="aloe_parse_workers",
+        default=0,
+        metavar="N",
+        help="Parse the feature files in advance using N worker processes",
+    )
+    group.addoption(
+        "--aloe-step-durations",
+        action="store",
+        type=int,
+        dest="aloe_step_durations",
+        default=None,
+        metavar="N",
+        help="Show the N slowest step definitions (N=0 for all)",
+    )
+    group.addoption(
+        "--aloe-step-timings",
+        action="store",
+        dest="aloe_step_timings",
+        default=None,
+        metavar="PATH",
+        help="Write the duration of every step run to PATH as JSON Lines",
+    )
+    group.addoption(
+        "--aloe-balance",
+        action="store_true",
+        dest="aloe_balance",
+        default=False,
+        help="With pytest-xdist, distribute the scenarios to the workers by their durations in the previous runs",
+    )
+    group.addoption(
+        "--aloe-event-loop",
+        action="store",
+        dest="aloe_event_loop",
+        choices=EventLoopRunner.scopes,
+        default="scenario",
+        help="Run the coroutine steps and callbacks in a new event loop for each scenario (default), "
+        "or in one for the whole session",
+    )
+    group.addoption(
+        "--aloe-profile-collection",
+        action="store_true",
+        dest="aloe_profile_collection",
+        default=False,
+        help="Show the time spent in each stage of generating the tests from the features, and the slowest files",
+    )
+    group.addoption(
+        "--aloe-profile-collection-json",
+        action="store",
+        dest="aloe_profile_collection_json",
+        default=None,
+        metavar="PATH",
+        help="Save the collection profile to PATH as JSON",
+    )
 
     # parser.addini('HELLO', 'Dummy pytest.ini setting')
 
 
+def pytest_configure(config):
+    try:
+        config.aloe_tags = TagExpression(*config.getoption("tags"))
+    except ValueError as ex:
+        raise pytest.UsageError(str(ex))
+
+    scenario_indices = config.getoption("scenario_indices")
+    try:
+        config.aloe_scenario_indices = frozenset(int(index) for index in scenario_indices.split(",") if index.strip())
+    except ValueError:
+        raise pytest.UsageError("Invalid scenario indices: {!r}".format(scenario_indices))
+
+    config.aloe_collection_profiler = None
+    if config.getoption("aloe_profile_collection") or config.getoption("aloe_profile_collection_json"):
+        config.aloe_collection_profiler = CollectionProfiler()
+        config.aloe_collection_profiler.install()
+
+    EVENT_LOOP_RUNNER.scope = config.getoption("aloe_event_loop")
+
+    if config.getoption("aloe_parse_cache") and getattr(config, "cache", None) is not None:
+        ParsedFeature.parse_cache = FeatureCache(config.cache)
+
+    config.aloe_step_timer = None
+    if config.getoption("aloe_step_durations") is not None:
+        config.aloe_step_timer = StepTimer()
+        config.aloe_step_timer.install()
+
+    config.aloe_step_timings = None
+    step_timings = config.getoption("aloe_step_timings")
+    if step_timings:
+        # xdist workers append to the file started by the controller
+        if not hasattr(config, "workerinput"):
+            open(step_timings, "w").close()
+        config.aloe_step_timings = StepTimingWriter(step_timings, worker=os.environ.get("PYTEST_XDIST_WORKER"))
+        config.aloe_step_timings.install()
+
+    # Test durations to balance the next runs are recorded by the xdist
+    # controller or the only process
+    if config.getoption("aloe_balance") and not hasattr(config, "workerinput"):
+        config.pluginmanager.register(DurationRecorder(config), "aloe-durations")
+
+
+def pytest_unconfigure(config):
+    if getattr(config, "aloe_collection_profiler", None) is not None:
+        config.aloe_collection_profiler.uninstall()
+
+    EVENT_LOOP_RUNNER.close()
+
+    if getattr(config, "aloe_step_timer", None) is not None:
+        config.aloe_step_timer.uninstall()
+
+    if getattr(config, "aloe_step_timings", None) is not None:
+        config.aloe_step_timings.uninstall()
+        config.aloe_step_timings.close()
+
+    # Collection might have been interrupted before finishing
+    if isinstance(ParsedFeature.parse_cache, ParallelFeatureParser):
+        ParsedFeature.parse_cache.close()
+    ParsedFeature.parse_cache = None
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("aloe_balance"):
+        return make_scheduler(config, log)
+
+
+def pytest_collection(session):
+    workers = session.config.getoption("aloe_parse_workers")
+    if workers > 0:
+        paths = [arg.split("::", 1)[0] for arg in session.config.args]
+        filenames = find_features(paths, norecursedirs=session.config.getini("norecursedirs"))
+        ParsedFeature.parse_cache = ParallelFeatureParser(filenames, workers, cache=ParsedFeature.parse_cache)
+
+
+def pytest_collection_finish(session):
+    profiler = session.config.aloe_collection_profiler
+    if profiler is not None:
+        profiler.uninstall()
+        profile_json = session.config.getoption("aloe_profile_collection_json")
+        if profile_json:
+            profiler.dump(profile_json)
+
+    parser = ParsedFeature.parse_cache
+    if isinstance(parser, ParallelFeatureParser):
+        parser.close()
+        ParsedFeature.parse_cache = parser.cache
+
+
+def pytest_sessionfinish(session):
+    # Send the step durations of an xdist worker to the controller
+    timer = session.config.aloe_step_timer
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if timer is not None and workeroutput is not None:
+        workeroutput["aloe_step_timer"] = timer.export()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    timer = node.config.aloe_step_timer
+    exported = getattr(node, "workeroutput", {}).get("aloe_step_timer")
+    if timer is not None and exported:
+        timer.merge(exported)
+
+
+def pytest_terminal_summary(terminalreporter):
+    profiler = terminalreporter.config.aloe_collection_profiler
+    if profiler is not None and terminalreporter.config.getoption("aloe_profile_collection"):
+        terminalreporter.write_sep("=", "aloe collection profile")
+        for line in profiler.summary():
+            terminalreporter.write_line(line)
+
+    timer = terminalreporter.config.aloe_step_timer
+    if timer is None:
+        return
+
+    count = terminalreporter.config.getoption("aloe_step_durations")
+    if count:
+        terminalreporter.write_sep("=", "slowest {} step definitions".format(count))
+    else:
+        terminalreporter.write_sep("=", "slowest step definitions")
+
+    for line in timer.summary(count):
+        terminalreporter.write_line(line)
+
+
 def pytest_collect_file(path, parent):
     """
     Collection hook for py.test
@@ -54,7 +275,24 @@ class Feature(File):
         test_class_module = import_module(module_name)
         test_class = getattr(test_class_module, class_name)
 
-        test_case = test_class.from_file(self.fspath.strpath)
+        options = {
+            "lazy": self.config.getoption("aloe_lazy"),
+            "tags": self.config.aloe_tags,
+            "indices": self.config.aloe_scenario_indices,
+            "step_runner": self.config.getoption("aloe_step_runner"),
+        }
+        # Only pass the options which are set, so that the test classes
+        # overriding from_file(cls, file_) keep working without them
+        from_file = partial(
+            test_class.from_file, self.fspath.strpath, **{name: value for name, value in options.items() if value}
+        )
+
+        profiler = self.config.aloe_collection_profiler
+        if profiler is None:
+            test_case = from_file()
+        else:
+            with profiler.collecting(self.fspath.strpath):
+                test_case = from_file()
         self.obj = test_case
 
         unit_test_case = FeatureUnitTestCase(test_case.feature.name, parent=self)
@@ -82,11 +320,21 @@ class FeatureUnitTestCase(UnitTestCase):
                 continue
             funcobj = getimfunc(x)
             function = TestCaseFunction(name, parent=self, callobj=funcobj)
-            self.obj.functions.append(function)
+            self.obj.functions[name] = function
             yield function
             foundsomething = True
 
 
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item):
+    # Drop the code generated for lazy scenarios once they have run and
+    # their failures have been reported
+    release = getattr(getattr(item, "obj", None), "release", None)
+    yield
+    if release is not None:
+        release()
+
+
 @pytest.fixture(autouse=True, scope="session")
 def session_hooks():
     before_all, after_all = CALLBACK_REGISTRY.before_after("all")
@@ -98,16 +346,17 @@ def session_hooks():
 
 
 def pytest_collection_modifyitems(items, config):
-    scenario_indices = config.getoption("scenario_indices")
-    if not scenario_indices:
+    # The scenarios are already filtered when generated; this only catches
+    # test classes generating them some other way
+    indices = config.aloe_scenario_indices
+    if not indices:
         return
 
     remaining = []
     deselected = []
-    indices = [int(str) for str in scenario_indices.split(",")]
     for colitem in items:
-        index = colitem.obj.scenario_index
-        if index not in indices:
+        index = getattr(getattr(colitem, "obj", None), "scenario_index", None)
+        if index is not None and index not in indices:
             deselected.append(colitem)
         else:
             remaining.append(colitem)
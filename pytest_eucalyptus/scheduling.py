@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Balancing the scenarios across pytest-xdist workers by their durations.
+"""
+
+import math
+import os
+import warnings
+from collections import OrderedDict
+
+import pytest
+
+try:
+    from xdist.scheduler import LoadScheduling
+except ImportError:  # pytest-xdist is not installed
+    LoadScheduling = object
+
+
+DURATIONS_KEY = "aloe/durations"
+
+# The state of LoadScheduling used by DurationScheduling, which is not part
+# of the public scheduler interface of pytest-xdist
+LOAD_SCHEDULING_STATE = (
+    "collection",
+    "collection_is_completed",
+    "node2collection",
+    "node2pending",
+    "nodes",
+    "pending",
+    "_check_nodes_have_same_collection",
+)
+
+
+def load_durations(config):
+    """The durations of the tests in the previous runs, by node ID."""
+
+    cache = getattr(config, "cache", None)
+    if cache is None:
+        return {}
+
+    return cache.get(DURATIONS_KEY, {})
+
+
+def save_durations(config, durations, collected=None):
+    """
+    Add the durations of the tests that were run to the cache.
+
+    If the node IDs collected in the session are given, the durations of the
+    tests of the files collected that are no longer there are dropped, as
+    well as the ones of the files that no longer exist.
+    """
+
+    cache = getattr(config, "cache", None)
+    if cache is None or not durations:
+        return
+
+    saved = cache.get(DURATIONS_KEY, {})
+
+    if collected is not None:
+        collected_files = set(nodeid.split("::", 1)[0] for nodeid in collected)
+
+        def exists(nodeid):
+            """Whether the test of a recorded duration might still exist."""
+            filename = nodeid.split("::", 1)[0]
+            if filename in collected_files:
+                return nodeid in collected
+            return os.path.exists(os.path.join(str(config.rootdir), filename))
+
+        saved = {nodeid: duration for nodeid, duration in saved.items() if exists(nodeid)}
+
+    saved.update(durations)
+    cache.set(DURATIONS_KEY, saved)
+
+
+def feature_chunks(collection, durations, workers):
+    """
+    Split the indices of the collected node IDs into chunks of consecutive
+    scenarios of the same feature, the longest running chunks first.
+
+    A feature stays in one chunk unless it takes longer than an even share of
+    the total time between the workers, then it is split into runs of about
+    that time. Tests without a recorded duration are assumed to take the
+    average time (or all the same time if none were recorded).
+    """
+
+    known = [durations[nodeid] for nodeid in collection if nodeid in durations]
+    default = sum(known) / len(known) if known else 1
+
+    def duration(index):
+        """The expected duration of a test."""
+        return durations.get(collection[index], default)
+
+    features = OrderedDict()
+    for index, nodeid in enumerate(collection):
+        features.setdefault(nodeid.rsplit("::", 1)[0], []).append(index)
+
+    total = sum(duration(index) for index in range(len(collection)))
+    share = total / max(workers, 1)
+
+    chunks = []
+    for indices in features.values():
+        feature_time = sum(duration(index) for index in indices)
+        parts = min(len(indices), workers, int(math.ceil(feature_time / share))) if share else 1
+        if parts <= 1:
+            chunks.append(indices)
+            continue
+
+        # Cut the feature where the running time crosses a part boundary
+        part_time = feature_time / parts
+        split = [[] for _ in range(parts)]
+        elapsed = 0
+        for index in indices:
+            part = min(int((elapsed + duration(index) / 2) / part_time), parts - 1)
+            split[part].append(index)
+            elapsed += duration(index)
+        chunks.extend(chunk for chunk in split if chunk)
+
+    return sorted(chunks, key=lambda chunk: -sum(duration(index) for index in chunk))
+
+
+class DurationRecorder(object):
+    """
+    A plugin recording the durations of the tests run (all their phases) in
+    the cache at the end of the session, forgetting the tests no longer
+    collected.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.durations = {}
+        self.collected = set()
+
+    def pytest_itemcollected(self, item):
+        self.collected.add(item.nodeid)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_node_collection_finished(self, node, ids):
+        self.collected.update(ids)
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0) + report.duration
+
+    def pytest_sessionfinish(self):
+        save_durations(self.config, self.durations, self.collected)
+
+
+class DurationScheduling(LoadScheduling):
+    """
+    Distribute the tests to the workers in chunks of consecutive scenarios of
+    one feature, the longest chunks (in the previous runs) first, each time
+    to the first available worker.
+
+    Keeping the scenarios of a feature together limits how often a worker
+    runs the feature set up and tear down (setUpClass/tearDownClass, i.e. the
+    before and after feature callbacks), as with the scheduling by file.
+    Only the features longer than a worker's share of the time are split
+    across the workers (see :func:`feature_chunks`).
+    """
+
+    # A worker needs to know the next test to run the current one
+    node_queue = 2
+
+    def __init__(self, config, log=None, durations=None):
+        super().__init__(config, log=log)
+        self.durations = durations if durations is not None else load_durations(config)
+        # The chunks not sent yet, in order; pending has their tests
+        self.chunks = []
+
+    def add_chunks(self, chunks):
+        """Queue chunks of tests to be sent to the workers."""
+
+        self.chunks.extend(chunks)
+        self.pending.extend(index for chunk in chunks for index in chunk)
+
+    def schedule(self):
+        assert self.collection_is_completed
+
+        # Initial distribution already happened, reschedule on all nodes
+        if self.collection is not None:
+            for node in self.nodes:
+                self.check_schedule(node)
+            return
+
+        if not self._check_nodes_have_same_collection():
+            self.log("**Different tests collected, aborting run**")
+            return
+
+        self.collection = list(self.node2collection.values())[0]
+        self.add_chunks(feature_chunks(self.collection, self.durations, len(self.nodes)))
+        if not self.collection:
+            return
+
+        for node in self.nodes:
+            self.check_schedule(node)
+
+    def check_schedule(self, node, duration=0):
+        if node.shutting_down:
+            return
+
+        if self.chunks:
+            while self.chunks and len(self.node2pending[node]) < self.node_queue:
+                self._send_chunk(node)
+        else:
+            node.shutdown()
+
+        self.log("num items waiting for node:", len(self.pending))
+
+    def _send_chunk(self, node):
+        chunk = self.chunks.pop(0)
+        del self.pending[: len(chunk)]
+        self.node2pending[node].extend(chunk)
+        node.send_runtest_some(chunk)
+
+    def remove_node(self, node):
+        pending = self.node2pending.pop(node)
+        if not pending:
+            return None
+
+        crashitem = self.collection[pending.pop(0)]
+        if pending:
+            self.add_chunks([pending])
+        for other in self.node2pending:
+            self.check_schedule(other)
+        return crashitem
+
+
+def make_scheduler(config, log=None):
+    """
+    A :class:`DurationScheduling`, or None to use the default scheduling of
+    pytest-xdist if its LoadScheduling does not have the expected state.
+    """
+
+    missing = LOAD_SCHEDULING_STATE
+    if LoadScheduling is not object:
+        try:
+            scheduler = DurationScheduling(config, log=log)
+        except TypeError:
+            pass
+        else:
+            missing = [name for name in LOAD_SCHEDULING_STATE if not hasattr(scheduler, name)]
+            if not missing:
+                return scheduler
+
+    warnings.warn(
+        "--aloe-balance is not supported by this version of pytest-xdist "
+        "(missing LoadScheduling.{}), using the default scheduling.".format(missing[0])
+    )
+    return None
@@ -0,0 +1,12 @@
+Feature: Asynchronous steps
+
+  Test coroutine steps and callbacks
+
+  Scenario: Run asynchronous steps
+    Given I record the event loop
+    And I record the event loop
+    Then the steps used the event loop of the scenario
+
+  Scenario: Run asynchronous steps again
+    Given I record the event loop
+    Then the steps used the event loop of the scenario
@@ -0,0 +1,7 @@
+Feature: Nested asynchronous steps
+
+  Test coroutine steps running other steps
+
+  Scenario: Await nested steps
+    Given I record the event loop twice
+    Then the steps used the event loop of the scenario
@@ -0,0 +1,6 @@
+Feature: Nested synchronous steps
+
+  Test coroutine steps running other steps synchronously
+
+  Scenario: Run a nested step without awaiting
+    Given I record the event loop without awaiting
@@ -0,0 +1,65 @@
+"""
+Coroutine steps and callbacks.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from aloe import after, around, before, step, world
+
+
+@before.all
+async def before_all():
+    """Start recording the events."""
+    world.events = ['all']
+    world.loops = []
+
+
+@around.each_example
+@asynccontextmanager
+async def around_example(scenario, outline, steps):
+    """Record the event loop of the scenario."""
+
+    world.events.append('{')
+    world.example_loop = asyncio.get_running_loop()
+    yield
+    world.events.append('}')
+
+
+@after.each_step
+async def after_step(step_):
+    """Record the step."""
+    await asyncio.sleep(0)
+    world.events.append('.')
+
+
+@step(r'I record the event loop')
+async def record_loop(self):
+    """Record the event loop running the step."""
+    await asyncio.sleep(0)
+    world.loops.append(asyncio.get_running_loop())
+
+
+@step(r'the steps used the event loop of the scenario')
+async def check_loop(self):
+    """Check the steps ran in the event loop of the scenario."""
+    assert asyncio.get_running_loop() is world.example_loop
+    assert world.loops[-1] is world.example_loop
+
+
+@step(r'I record the event loop twice')
+async def record_loop_twice(self):
+    """Record the event loop running two nested steps."""
+    await self.given_async('I record the event loop')
+    await self.behave_as_async('And I record the event loop')
+
+
+@step(r'I record the event loop without awaiting')
+async def record_loop_without_awaiting(self):
+    """Run a nested step synchronously, which cannot work."""
+    self.given('I record the event loop')
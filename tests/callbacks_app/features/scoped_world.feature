@@ -0,0 +1,9 @@
+Feature: Scoped world
+
+  Test the scopes of the scoped world
+
+  Scenario: Change the scoped world
+    Given I add "A" to the scoped world
+
+  Scenario: Change the scoped world again
+    Given I add "B" to the scoped world
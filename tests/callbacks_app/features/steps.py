@@ -17,6 +17,7 @@ from aloe import (
     after,
     around,
     before,
+    scoped_world,
     step,
     world,
 )
@@ -39,6 +40,17 @@ class CallbackTestCase(TestCase):  # pylint:disable=abstract-method
         super().tearDown()
 
 
+class FromFileTestCase(CallbackTestCase):  # pylint:disable=abstract-method
+    """A test case overriding from_file without the collection options."""
+
+    @classmethod
+    def from_file(cls, file_):  # pylint:disable=arguments-differ
+        """Record constructing the test class."""
+
+        record_event('from_file', file_)
+        return super().from_file(file_)
+
+
 def record_event(kind, value):
     """
     Record an event of a particular kind. Used for testing the order of
@@ -252,3 +264,36 @@ def good_step(self):
 def bad_step(self):
     """A step that always fails."""
     assert False, "This step is meant to fail."
+
+
+@before.all
+def scoped_world_all():
+    """Set up the session scope of the scoped world."""
+    scoped_world.letters = ['all']
+
+
+@before.each_feature
+def scoped_world_feature(feature):
+    """Set up the feature scope of the scoped world."""
+    scoped_world.feature = feature.name
+
+
+@before.each_example
+def scoped_world_example(scenario, outline, steps):
+    """Set up the scenario scope of the scoped world."""
+    scoped_world.example = scenario.name
+
+
+@step(r'I add "([^"]+)" to the scoped world')
+def add_to_scoped_world(self, letter):
+    """Change the scoped world, and record what the scenario sees in it."""
+
+    scoped_world.letters.append(letter)
+    assert not hasattr(scoped_world, 'letter')
+    scoped_world.letter = letter
+
+    record_event('scoped', (
+        scoped_world.feature,
+        scoped_world.example,
+        ''.join(scoped_world.letters),
+    ))
@@ -0,0 +1,76 @@
+"""
+Test coroutine steps and callbacks.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+from aloe import world
+from aloe.utils import StreamTestWrapperIO
+from tests.testing import (
+    FeatureTest,
+    in_directory,
+)
+
+# Pylint cannot infer the attributes on world
+# pylint:disable=no-member
+
+
+@in_directory('tests/async_app')
+class AsyncTest(FeatureTest):
+    """
+    Test coroutine steps and callbacks.
+    """
+
+    def test_loop_per_scenario(self):
+        """
+        Test each scenario getting its own event loop.
+        """
+
+        self.assert_feature_success('features/async.feature')
+
+        self.assertEqual(''.join(world.events), 'all{...}{..}')
+
+        self.assertEqual(len(world.loops), 3)
+        self.assertIs(world.loops[0], world.loops[1])
+        self.assertIsNot(world.loops[1], world.loops[2])
+        self.assertTrue(all(loop.is_closed() for loop in world.loops))
+
+    def test_loop_per_session(self):
+        """
+        Test sharing an event loop between the scenarios.
+        """
+
+        self.assert_feature_success('--aloe-event-loop=session', 'features/async.feature')
+
+        self.assertEqual(''.join(world.events), 'all{...}{..}')
+
+        self.assertEqual(len(set(world.loops)), 1)
+        self.assertTrue(world.loops[0].is_closed())
+
+    def test_nested_steps(self):
+        """
+        Test coroutine steps awaiting other steps.
+        """
+
+        self.assert_feature_success('features/nested.feature')
+
+        # The nested steps run the step callbacks too
+        self.assertEqual(''.join(world.events), 'all{....}')
+
+        self.assertEqual(len(world.loops), 2)
+        self.assertIs(world.loops[0], world.loops[1])
+
+    def test_nested_steps_synchronously(self):
+        """
+        Test a clear error running other steps synchronously from a coroutine
+        step.
+        """
+
+        stream = StreamTestWrapperIO()
+        self.assert_feature_fail('features/nested_sync.feature', stream=stream)
+
+        self.assertIn("Use 'await self.given_async()'", stream.getvalue())
+        self.assertEqual(world.loops, [])
@@ -0,0 +1,49 @@
+"""
+Test the benchmark of a synthetic corpus.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCHMARK = os.path.join(ROOT, 'tools', 'benchmark.py')
+
+
+def test_benchmark(tmpdir):
+    """
+    Test benchmarking a small corpus and comparing with the results.
+    """
+
+    results = tmpdir.join('results.json')
+    corpus = tmpdir.join('corpus')
+
+    subprocess.check_call([
+        sys.executable, BENCHMARK,
+        '--features', '2', '--scenarios', '3', '--definitions', '10',
+        '--repeat', '1',
+        '--directory', str(corpus),
+        '--output', str(results),
+    ], cwd=str(tmpdir))
+
+    assert len(corpus.join('features').listdir('*.feature')) == 2
+
+    data = json.loads(results.read())
+    assert set(data['phases']) == {'parse', 'match', 'codegen', 'collection', 'run'}
+    assert data['counts']['features'] == 2
+    assert data['counts']['scenarios'] == 6
+
+    comparison = subprocess.check_output([
+        sys.executable, BENCHMARK,
+        '--features', '1', '--repeat', '1',
+        '--baseline', str(results),
+    ], cwd=str(tmpdir)).decode()
+
+    assert comparison.splitlines()[0].split() == ['phase', 'baseline', 'current', 'ratio']
+    assert len(comparison.splitlines()) == 6
@@ -8,11 +8,12 @@ from __future__ import division
 from __future__ import absolute_import
 
 import operator
+import os
 from functools import reduce  # pylint:disable=redefined-builtin
 import pytest
 
 
-from aloe import world
+from aloe import scoped_world, world
 from aloe.testclass import TestCase
 from tests.testing import (
     FeatureTest,
@@ -119,6 +120,38 @@ class CallbackTest(FeatureTest):
         self.run_features()
         assert ''.join(world.all) ==  '{[ABCD]}'
 
+    def test_scoped_world(self):
+        """Test the scopes of the scoped world."""
+
+        self.assert_feature_success('features/scoped_world.feature')
+
+        assert world.scoped == [
+            ('Scoped world', 'Change the scoped world', 'allA'),
+            ('Scoped world', 'Change the scoped world again', 'allAB'),
+        ]
+
+        # Only the session scope remains
+        assert scoped_world.letters == ['all', 'A', 'B']
+        assert not hasattr(scoped_world, 'feature')
+        assert not hasattr(scoped_world, 'example')
+        assert not hasattr(scoped_world, 'letter')
+
+    def test_scoped_world_snapshot(self):
+        """Test the scenarios changing copies of the outer scopes."""
+
+        scoped_world.snapshot = True
+        try:
+            self.assert_feature_success('features/scoped_world.feature')
+        finally:
+            scoped_world.snapshot = False
+
+        assert world.scoped == [
+            ('Scoped world', 'Change the scoped world', 'allA'),
+            ('Scoped world', 'Change the scoped world again', 'allB'),
+        ]
+
+        assert scoped_world.letters == ['all']
+
     def test_testcase_methods(self):
         """Test setUp and tearDown on the test class."""
 
@@ -130,6 +163,16 @@ class CallbackTest(FeatureTest):
         # by setUp() and followed by tearDown().
         assert ''.join(world.testclass) ==  '[BS][BO][BU]'
 
+    def test_testcase_from_file(self):
+        """Test a test class overriding from_file with its original arguments."""
+
+        test_cls = 'tests.callbacks_app.features.steps.FromFileTestCase'
+        with set_environ(GHERKIN_CLASS=test_cls):
+            self.assert_feature_success('features/testcase_methods.feature')
+
+        assert [os.path.basename(file_) for file_ in world.from_file] == ['testcase_methods.feature']
+        assert ''.join(world.testclass) == '[BS][BO][BU]'
+
     def test_relative_order(self):
         """
         Test the relative order of callbacks - from global to specific.
@@ -8,16 +8,20 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import json
 import sys
 import os
 import unittest
 from contextlib import contextmanager
+from importlib.util import find_spec
 from inspect import getsourcefile
 
 # from nose.importer import Importer
 
 from aloe import world
 from aloe.exceptions import StepDiscoveryError
+from aloe.parser import Feature as ParsedFeature
+from aloe.registry import StepDict
 
 from tests.testing import (
     FeatureTest,
@@ -56,6 +60,285 @@ class SimpleScenarioTest(FeatureTest):
 
         self.assert_feature_success('features/calculator_zh.feature')
 
+    def test_fixtures(self):
+        """
+        Test passing the fixtures of each scenario to the steps.
+        """
+
+        self.assert_feature_success('features/fixtures.feature')
+
+    @unittest.skipUnless(find_spec('pytest_rerunfailures'), "pytest-rerunfailures is not installed")
+    def test_fixtures_rerun(self):
+        """
+        Test passing the fixtures to the steps when rerunning a scenario.
+        """
+
+        self.assert_feature_fail('features/rerun_fixtures.feature', '-p', 'no:rerunfailures')
+        for args in ((), ('--aloe-lazy',)):
+            result = self.assert_feature_success('features/rerun_fixtures.feature', '--reruns', '1', *args)
+            self.assertEqual(result.reruns, 1)
+
+    def test_parse_cache(self):
+        """
+        Test running features parsed from the cache.
+        """
+
+        for _ in range(2):
+            self.assert_feature_success('features/calculator.feature', '--aloe-parse-cache')
+            self.assert_feature_success('features/calculator_zh.feature', '--aloe-parse-cache')
+
+    def test_parse_workers(self):
+        """
+        Test running features parsed in worker processes.
+        """
+
+        self.assert_feature_success('features/calculator.feature', '--aloe-parse-workers', '2')
+        self.assert_feature_success('features', '-k', 'calculator', '--aloe-parse-workers', '2')
+        self.assert_feature_fail('features/wrong_expectations.feature', '--aloe-parse-workers', '2')
+
+    def test_lazy(self):
+        """
+        Test running features with the scenario code generated when run.
+        """
+
+        self.assert_feature_success('features/calculator.feature', '--aloe-lazy')
+        self.assert_feature_success('features/outlines.feature', '--aloe-lazy')
+        self.assert_feature_success('features/background.feature', '--aloe-lazy')
+        self.assert_feature_success('features/fixtures.feature', '--aloe-lazy')
+
+        stream = StreamTestWrapperIO()
+
+        failing_feature = 'features/wrong_expectations.feature'
+
+        self.assert_feature_fail(failing_feature, '--aloe-lazy', stream=stream)
+
+        output = stream.getvalue()
+
+        self.assertIn(f"""
+>       Then the result should be 40 on the screen
+
+{failing_feature}:11:""", output)
+        self.assertIn(f"""
+>         | 50     |
+
+{failing_feature}:22: 
+""", output)
+
+    def test_step_durations(self):
+        """
+        Test reporting the slowest step definitions.
+        """
+
+        stream = StreamTestWrapperIO()
+
+        self.assert_feature_success('features/calculator.feature', '--aloe-step-durations', '2', stream=stream)
+
+        output = stream.getvalue()
+
+        self.assertIn("slowest 2 step definitions", output)
+        self.assertRegex(output, r"\n +total +count +p50 +p95 +max  definition\n")
+        self.assertRegex(
+            output,
+            r"\n +[0-9.]+s +2 +[0-9.]+s +[0-9.]+s +[0-9.]+s  "
+            r"I have entered \(\\d\+\) into the calculator\$ \(enter_number at conftest\.py:\d+\)\n",
+        )
+
+    @unittest.skipUnless(find_spec('xdist'), "pytest-xdist is not installed")
+    def test_step_durations_xdist(self):
+        """
+        Test reporting the slowest step definitions run by xdist workers.
+        """
+
+        stream = StreamTestWrapperIO()
+
+        self.assert_feature_success(
+            'features/calculator.feature', 'features/outlines.feature', '--aloe-step-durations', '0', '-n', '2',
+            stream=stream,
+        )
+
+        output = stream.getvalue()
+
+        self.assertIn("slowest step definitions", output)
+        # Both features enter numbers: 2 steps in calculator, 3 x 2 in outlines
+        self.assertRegex(
+            output,
+            r"\n +[0-9.]+s +8 +[0-9.]+s +[0-9.]+s +[0-9.]+s  "
+            r"I have entered \(\\d\+\) into the calculator\$ \(enter_number at conftest\.py:\d+\)\n",
+        )
+
+    def test_profile_collection(self):
+        """
+        Test profiling the stages of the collection.
+        """
+
+        stream = StreamTestWrapperIO()
+
+        self.assert_feature_success(
+            'features/calculator.feature',
+            'features/outlines.feature',
+            '--aloe-profile-collection',
+            '--aloe-profile-collection-json',
+            'profile.json',
+            stream=stream,
+        )
+
+        output = stream.getvalue()
+
+        self.assertIn("aloe collection profile", output)
+        self.assertRegex(output, r"\nparse +2 +[0-9.]+s +[0-9.]+%\n")
+        self.assertRegex(output, r"\n +total +parse +outlines +match +wrap +compile  file\n")
+        self.assertRegex(output, r"\n +[0-9.]+s( +[0-9.]+s){5}  features/outlines\.feature\n")
+
+        with open(self.testdir.tmpdir.join('profile.json').strpath) as profile_json:
+            profile = json.load(profile_json)
+
+        self.assertEqual(
+            {stage: times['calls'] > 0 for stage, times in profile['stages'].items()},
+            {'parse': True, 'outlines': True, 'match': True, 'wrap': True, 'compile': True},
+        )
+        outlines = [
+            times for filename, times in profile['files'].items()
+            if filename.endswith('outlines.feature')
+        ][0]
+        self.assertEqual(outlines['stages']['parse']['calls'], 1)
+        self.assertGreater(outlines['total'], 0)
+
+        # The stages are no longer timed
+        self.assertFalse(hasattr(ParsedFeature.parse, '__wrapped__'))
+        self.assertFalse(hasattr(StepDict.match_step, '__wrapped__'))
+
+    def test_closure_step_runner(self):
+        """
+        Test the steps run in a loop fail at the same feature lines as the
+        compiled ones.
+        """
+
+        locations = {}
+        for runner in ('compiled', 'closure'):
+            stream = StreamTestWrapperIO()
+            self.assert_feature_fail(
+                'features/wrong_expectations.feature',
+                'features/outlines.feature',
+                '--aloe-step-runner', runner,
+                stream=stream,
+            )
+            locations[runner] = [
+                line for line in stream.getvalue().splitlines()
+                if line.startswith('features/')
+            ]
+
+        self.assertEqual(locations['closure'], locations['compiled'])
+        self.assertIn('features/wrong_expectations.feature:11: ', locations['closure'])
+        self.assertIn('features/wrong_expectations.feature:18: in Fail repeatedly', locations['closure'])
+
+    def test_step_timings(self):
+        """
+        Test writing the step durations to a file.
+        """
+
+        self.assert_feature_fail('features/wrong_expectations.feature', '--aloe-step-timings', 'timings.jsonl')
+
+        with open(self.testdir.tmpdir.join('timings.jsonl').strpath) as timings:
+            records = [json.loads(line) for line in timings]
+
+        self.assertEqual(
+            [(record['line'], record['sentence'], record['outcome']) for record in records[:4]],
+            [
+                (7, 'Given I have entered 10 into the calculator', 'passed'),
+                (8, 'And I have entered 20 into the calculator', 'passed'),
+                (9, 'When I press add', 'passed'),
+                (11, 'Then the result should be 40 on the screen', 'failed'),
+            ],
+        )
+
+        record = records[0]
+        self.assertEqual(record['feature'], 'features/wrong_expectations.feature')
+        self.assertEqual(record['definition'], r'I have entered (\d+) into the calculator$')
+        self.assertRegex(record['function'], r'^enter_number at .*conftest\.py:\d+$')
+        self.assertIsInstance(record['duration'], float)
+        self.assertIsNone(record['worker'])
+
+    @unittest.skipUnless(find_spec('xdist'), "pytest-xdist is not installed")
+    def test_balance(self):
+        """
+        Test distributing the scenarios to xdist workers by their durations.
+        """
+
+        features = ('features/outlines.feature', 'features/background.feature', 'features/calculator.feature')
+
+        self.assert_feature_success(*features, '-n', '2', '--aloe-balance')
+
+        durations = self.testdir.tmpdir.join('.pytest_cache', 'v', 'aloe', 'durations')
+        with open(durations.strpath) as durations_file:
+            recorded = json.load(durations_file)
+
+        self.assertEqual(
+            sorted(recorded),
+            [
+                'features/background.feature::Rigged calculator::Add two numbers',
+                'features/calculator.feature::Add up numbers::Add two numbers',
+                'features/outlines.feature::Add up different sets numbers::Add two numbers: Example 1',
+                'features/outlines.feature::Add up different sets numbers::Add two numbers: Example 2',
+            ],
+        )
+
+        # Balance using the recorded durations
+        self.assert_feature_success(*features, '-n', '2', '--aloe-balance')
+        self.assert_feature_success(*features, '--aloe-balance')
+
+        # The durations of the scenarios no longer there are forgotten
+        for extra_args in (('-n', '2'), ()):
+            durations.write(json.dumps(dict(
+                recorded,
+                **{
+                    'features/calculator.feature::Add up numbers::Renamed': 1.0,
+                    'features/deleted.feature::Deleted::Scenario': 1.0,
+                }
+            )))
+            self.assert_feature_success(*features, '--aloe-balance', *extra_args)
+            with open(durations.strpath) as durations_file:
+                self.assertEqual(sorted(json.load(durations_file)), sorted(recorded))
+
+    @unittest.skipUnless(find_spec('xdist'), "pytest-xdist is not installed")
+    def test_balance_feature_locality(self):
+        """
+        Test keeping the scenarios of a feature together when balancing them
+        across the xdist workers.
+        """
+
+        features = ('features/balanced_one.feature', 'features/balanced_two.feature')
+        log = self.testdir.tmpdir.join('features.log')
+
+        def feature_setups():
+            """The (worker, feature) set ups of the run, emptying the log."""
+            setups = [tuple(line.split(' ', 1)) for line in log.read().splitlines()]
+            log.remove()
+            return setups
+
+        # Without durations, each feature runs whole on a worker
+        self.assert_feature_success(*features, '-n', '2', '--aloe-balance')
+        setups = feature_setups()
+        self.assertEqual(
+            sorted(feature for _, feature in setups), ['Balanced feature one', 'Balanced feature two']
+        )
+
+        # A feature taking longer than a worker's share is split between them
+        durations = {
+            'features/balanced_{}.feature::Balanced feature {}::Enter number {}'.format(name, name, index): duration
+            for name, duration in (('one', 1.0), ('two', 0.1))
+            for index in range(1, 7)
+        }
+        self.testdir.tmpdir.join('.pytest_cache', 'v', 'aloe', 'durations').write(json.dumps(durations))
+
+        self.assert_feature_success(*features, '-n', '2', '--aloe-balance')
+        setups = feature_setups()
+        self.assertEqual(len(setups), 3)
+        self.assertEqual(len(set(setups)), 3)
+        self.assertEqual(
+            sorted(feature for _, feature in setups),
+            ['Balanced feature one', 'Balanced feature one', 'Balanced feature two'],
+        )
+
     def test_failure(self):
         """
         Test that a failing feature fails tests.
@@ -301,6 +584,34 @@ E       AssertionError: assert 30.0 == 50.0
         self.assert_feature_success(feature_one, feature_two, '-m', 'not hana and not dul')
         self.assertEqual(world.all_results, [4])
 
+    def test_tag_expressions(self):
+        """
+        Test specifying the tags to run with tag expressions.
+        """
+
+        feature_one = 'features/withtags_one.feature'
+        feature_two = 'features/withtags_two.feature'
+
+        self.assert_feature_success(feature_one, '--tags', '@hana')
+        self.assertEqual(world.all_results, [1, 11, 22])
+
+        self.assert_feature_success(feature_one, '--tags', 'set')
+
+        self.assert_feature_success(feature_one, feature_two, '--tags', '@dul')
+        self.assertEqual(world.all_results, [2, 13, 20, 200])
+
+        self.assert_feature_success(feature_one, '--tags', '~@hana')
+        self.assertEqual(world.all_results, [2, 4])
+
+        self.assert_feature_success(feature_one, '--tags', '@hana,@dul')
+        self.assertEqual(world.all_results, [1, 2, 11, 22])
+
+        self.assert_feature_success(feature_one, feature_two, '--tags', '~@hana', '--tags', '~@dul')
+        self.assertEqual(world.all_results, [4])
+
+        self.assert_feature_success(feature_two, '--tags', '@dul and not (@hana or @set)', '--aloe-lazy')
+        self.assertEqual(world.all_results, [20, 200])
+
 @unittest.skip("The test is no longer valid. All steps should be written/referenced in conftest.py")
 class BadStepsTest(FeatureTest):
     """
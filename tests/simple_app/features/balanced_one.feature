@@ -0,0 +1,31 @@
+Feature: Balanced feature one
+
+  Scenario: Enter number 1
+    Given I have entered 1 into the calculator
+    When I press add
+    Then the result should be 1 on the screen
+
+  Scenario: Enter number 2
+    Given I have entered 2 into the calculator
+    When I press add
+    Then the result should be 2 on the screen
+
+  Scenario: Enter number 3
+    Given I have entered 3 into the calculator
+    When I press add
+    Then the result should be 3 on the screen
+
+  Scenario: Enter number 4
+    Given I have entered 4 into the calculator
+    When I press add
+    Then the result should be 4 on the screen
+
+  Scenario: Enter number 5
+    Given I have entered 5 into the calculator
+    When I press add
+    Then the result should be 5 on the screen
+
+  Scenario: Enter number 6
+    Given I have entered 6 into the calculator
+    When I press add
+    Then the result should be 6 on the screen
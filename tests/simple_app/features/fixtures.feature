@@ -0,0 +1,11 @@
+Feature: Use fixtures in steps
+
+  Scenario: Recall
+    Given I recall the memory into the calculator
+    When I press add
+    Then the result should be 6 on the screen
+
+  Scenario: Enter and recall
+    Given I have entered 10 and the memory into the calculator
+    When I press add
+    Then the result should be 26 on the screen
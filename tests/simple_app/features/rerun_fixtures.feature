@@ -0,0 +1,6 @@
+Feature: Rerun scenarios using fixtures
+
+  Scenario: Recall after failing
+    Given I fail once and recall the memory into the calculator
+    When I press add
+    Then the result should be 20 on the screen
@@ -8,6 +8,10 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import os
+
+import pytest
+
 from aloe import after, before, step, world
 
 # pylint:disable=unused-argument
@@ -19,6 +23,15 @@ def init_all_results():
     world.all_results = []
 
 
+@before.each_feature
+def log_balanced_feature(feature):
+    """Record the processes setting up the balanced features."""
+    if feature.name.startswith('Balanced'):
+        log_name = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'features.log')
+        with open(log_name, 'a') as log:
+            log.write('{} {}\n'.format(os.environ.get('PYTEST_XDIST_WORKER', 'master'), feature.name))
+
+
 @before.each_example
 def clear(*args):
     """Clean the results for each example."""
@@ -50,6 +63,33 @@ def press_plus(self):
     self.given('I press add')
 
 
+@pytest.fixture
+def memory(request):
+    """A number stored in the calculator memory, depending on the test."""
+    return len(request.node.name)
+
+
+@step(r'I recall the memory into the calculator')
+def recall_memory(self, memory):
+    """Enter the number from the memory."""
+    world.numbers.append(float(memory))
+
+
+@step(r'I have entered (\d+) and the memory into the calculator')
+def enter_number_and_memory(self, number, memory):
+    """Enter a number and the number from the memory."""
+    world.numbers.extend((float(number), float(memory)))
+
+
+@step(r'I fail once and recall the memory into the calculator')
+def fail_once_recall_memory(self, memory):
+    """Fail the first time, then enter the number from the memory."""
+    if not getattr(world, 'failed_once', False):
+        world.failed_once = True
+        raise AssertionError("Failing the first time")
+    world.numbers.append(float(memory))
+
+
 @step(r'I have a table')
 def have_table(self):
     """Nothing."""
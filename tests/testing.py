@@ -21,7 +21,7 @@ import pytest
 import glob
 import shutil
 
-from aloe import world
+from aloe import scoped_world, world
 from aloe.fs import path_to_module_name
 from aloe.registry import (
     CALLBACK_REGISTRY,
@@ -172,6 +172,7 @@ class FeatureTest(unittest.TestCase):
         CALLBACK_REGISTRY.clear(priority_class=PriorityClass.USER)
         STEP_REGISTRY.clear()
         world.__dict__.clear()
+        scoped_world.clear()
         
         old_stdout = sys.stdout        
         sys.stdout = stream
@@ -218,6 +219,8 @@ class FeatureTest(unittest.TestCase):
 
 class TestResult(object):
     def __init__(self, result, stream):
-        realpassed, realskipped, realfailed = result.listoutcomes();
-        self.success = len(realskipped) == 0 and len(realfailed) == 0
+        reports = result.getreports("pytest_collectreport pytest_runtest_logreport")
+        # Attempts rerun by pytest-rerunfailures neither fail nor skip
+        self.success = not any(rep.skipped or rep.failed for rep in reports)
+        self.reruns = sum(1 for rep in reports if rep.outcome == 'rerun')
         self.captured_stream = stream        
\ No newline at end of file
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Test the cache of parsed features.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import io
+import json
+import os
+
+import pytest
+from mock import patch
+
+from aloe.cache import FeatureCache, ParallelFeatureParser, find_features
+from aloe.exceptions import AloeSyntaxError
+from aloe.parser import Feature
+from tests.testing import named_temporary_file
+
+FEATURE = """
+Feature: Cached feature
+    Scenario: Cached scenario
+        Given I have {count} apples
+"""
+
+
+class FakeStore(dict):
+    """A store with the same interface as pytest's cache."""
+
+    def set(self, key, value):
+        """Store a value, serialized the same way pytest does."""
+        self[key] = json.loads(json.dumps(value))
+
+
+def write(filename, content):
+    """Overwrite a file with the given content."""
+    with io.open(filename, "w", encoding="utf-8") as file_:
+        file_.write(content)
+
+
+@pytest.fixture
+def feature_cache():
+    """Set up a feature cache for the duration of the test."""
+    cache = FeatureCache(FakeStore())
+    Feature.parse_cache = cache
+    try:
+        yield cache
+    finally:
+        Feature.parse_cache = None
+
+
+def test_feature_cache(feature_cache):  # pylint:disable=redefined-outer-name
+    """
+    Test that parsing the same file again uses the cache.
+    """
+
+    with named_temporary_file(suffix=".feature") as file_:
+        file_.close()
+        write(file_.name, FEATURE.format(count=1))
+
+        with patch.object(Feature, "parse_gherkin", wraps=Feature.parse_gherkin) as parse_gherkin:
+            feature = Feature.from_file(file_.name)
+            assert feature.scenarios[0].steps[0].sentence == "Given I have 1 apples"
+            assert parse_gherkin.call_count == 1
+
+            feature = Feature.from_file(file_.name)
+            assert feature.name == "Cached feature"
+            assert feature.filename == file_.name
+            assert feature.scenarios[0].steps[0].sentence == "Given I have 1 apples"
+            assert parse_gherkin.call_count == 1
+
+            # Only touching the file keeps the entry
+            stat = os.stat(file_.name)
+            os.utime(file_.name, (stat.st_atime, stat.st_mtime + 10))
+            Feature.from_file(file_.name)
+            assert parse_gherkin.call_count == 1
+
+            # Changing the content doesn't
+            write(file_.name, FEATURE.format(count=22))
+            os.utime(file_.name, (stat.st_atime, stat.st_mtime + 20))
+            feature = Feature.from_file(file_.name)
+            assert feature.scenarios[0].steps[0].sentence == "Given I have 22 apples"
+            assert parse_gherkin.call_count == 2
+
+            # Neither does another Gherkin version
+            feature_cache.gherkin_version = "0.0.0"
+            Feature.from_file(file_.name)
+            assert parse_gherkin.call_count == 3
+
+            # Strings are never cached
+            Feature.from_string(FEATURE.format(count=1))
+            Feature.from_string(FEATURE.format(count=1))
+            assert parse_gherkin.call_count == 5
+
+
+def test_feature_cache_syntax_error(feature_cache):  # pylint:disable=redefined-outer-name
+    """
+    Test that syntax errors are reported and not cached.
+    """
+
+    with named_temporary_file(suffix=".feature") as file_:
+        file_.close()
+        write(file_.name, "Not a feature\n")
+
+        for _ in range(2):
+            with pytest.raises(AloeSyntaxError) as error:
+                Feature.from_file(file_.name)
+            assert error.value.filename == file_.name
+
+        assert not feature_cache.store
+
+
+def test_find_features(tmpdir):
+    """
+    Test finding the feature files in advance.
+    """
+
+    tmpdir.join("one.feature").write("")
+    tmpdir.join("steps.py").write("")
+    tmpdir.mkdir("sub").join("two.feature").write("")
+    tmpdir.mkdir(".hidden").join("three.feature").write("")
+
+    assert list(find_features([str(tmpdir), str(tmpdir.join("one.feature"))], norecursedirs=[".*"])) == [
+        str(tmpdir.join("one.feature")),
+        str(tmpdir.join("sub", "two.feature")),
+        str(tmpdir.join("one.feature")),
+    ]
+
+
+def test_parallel_parser(tmpdir):
+    """
+    Test parsing feature files in worker processes.
+    """
+
+    good = tmpdir.join("good.feature")
+    good.write(FEATURE.format(count=1))
+    bad = tmpdir.join("bad.feature")
+    bad.write("Not a feature\n")
+    unknown = tmpdir.join("unknown.feature")
+    unknown.write(FEATURE.format(count=3))
+
+    parser = ParallelFeatureParser([str(good), str(bad)], 2)
+    Feature.parse_cache = parser
+    try:
+        with patch.object(Feature, "parse_gherkin", wraps=Feature.parse_gherkin) as parse_gherkin:
+            feature = Feature.from_file(str(good))
+            assert feature.filename == str(good)
+            assert feature.scenarios[0].steps[0].sentence == "Given I have 1 apples"
+
+            with pytest.raises(AloeSyntaxError) as error:
+                Feature.from_file(str(bad))
+            assert error.value.filename == str(bad)
+
+            # Only the files not known in advance are parsed here
+            assert parse_gherkin.call_count == 0
+            feature = Feature.from_file(str(unknown))
+            assert feature.scenarios[0].steps[0].sentence == "Given I have 3 apples"
+            assert parse_gherkin.call_count == 1
+    finally:
+        Feature.parse_cache = None
+        parser.close()
+
+
+def test_parallel_parser_cache(tmpdir, feature_cache):  # pylint:disable=redefined-outer-name
+    """
+    Test parsing feature files in worker processes together with the cache.
+    """
+
+    cached = tmpdir.join("cached.feature")
+    cached.write(FEATURE.format(count=1))
+    Feature.from_file(str(cached))
+
+    new = tmpdir.join("new.feature")
+    new.write(FEATURE.format(count=2))
+
+    parser = ParallelFeatureParser([str(cached), str(new)], 2, cache=feature_cache)
+    assert list(parser.futures) == [str(new)]
+
+    Feature.parse_cache = parser
+    try:
+        assert Feature.from_file(str(cached)).scenarios[0].steps[0].sentence == "Given I have 1 apples"
+        assert Feature.from_file(str(new)).scenarios[0].steps[0].sentence == "Given I have 2 apples"
+    finally:
+        parser.close()
+
+    assert feature_cache.cached(str(new), None) is not None
@@ -7,12 +7,17 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
 
+import ast
+import sys
+import traceback
 import unittest
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 
 from aloe.codegen import (
+    compile_template,
     make_function,
     multi_manager,
+    relocate_traceback,
 )
 
 
@@ -44,6 +49,111 @@ class TestCodegen(unittest.TestCase):
         )
         self.assertEqual(adder(10, 3), 23)
         self.assertEqual(adder.__name__, 'adder')
+        self.assertEqual(adder.__qualname__, 'adder')
+
+    def test_statement_lines(self):
+        """Test reporting the given lines for the statements."""
+
+        source = (
+            'def template():\n'
+            '    value = 1\n'
+            '    raise ValueError(\n'
+            '        value)\n'
+        )
+
+        for line in (10, 1000, 300, 1):
+            for func_source in (source, ast.parse(source)):
+                func = make_function(
+                    func_source,
+                    source_file='some.feature',
+                    name='line {}'.format(line),
+                    statement_lines=(None, line),
+                )
+                self.assertEqual(func.__name__, 'line {}'.format(line))
+                self.assertEqual(func.__code__.co_name, 'line {}'.format(line))
+
+                try:
+                    func()
+                except ValueError as ex:
+                    frame = traceback.extract_tb(ex.__traceback__)[-1]
+                else:
+                    raise AssertionError("Should raise ValueError")
+                self.assertEqual(
+                    (frame.filename, frame.lineno, frame.name),
+                    ('some.feature', line, 'line {}'.format(line)),
+                )
+
+    def test_template_cache(self):
+        """Test compiling the same source once."""
+
+        source = 'def cached(): return value'
+        make_function(source, context={'value': 1})
+        hits = compile_template.cache_info().hits
+
+        func = make_function(source, context={'value': 2}, name='other')
+        self.assertEqual(func(), 2)
+        self.assertEqual(func.__name__, 'other')
+
+        self.assertEqual(compile_template.cache_info().hits, hits + 1)
+
+    def test_template_lines(self):
+        """Test moving the lines of a reused template like the AST ones."""
+
+        source = 'def template():\n' + ''.join(
+            '    value{0} = [\n'
+            '        {0},\n'
+            '    ]\n'.format(i)
+            for i in range(100)
+        )
+
+        for statement_lines in (
+                tuple(range(10, 110)),
+                tuple(range(5000, 5100)),
+                tuple(range(900, 800, -1)),
+                (None,) * 50 + tuple(range(1, 51)),
+        ):
+            lines = []
+            for func_source in (source, ast.parse(source)):
+                func = make_function(
+                    func_source,
+                    source_file='some.feature',
+                    statement_lines=statement_lines,
+                )
+
+                def trace(frame, event, _, lines=lines, code=func.__code__):
+                    """Record the lines run in the function."""
+                    if frame.f_code is code and event == 'line':
+                        lines.append(frame.f_lineno)
+                    return trace
+
+                sys.settrace(trace)
+                try:
+                    func()
+                finally:
+                    sys.settrace(None)
+
+            self.assertEqual(lines[:len(lines) // 2], lines[len(lines) // 2:])
+            self.assertIn(statement_lines[-1], lines)
+
+    def test_relocate_traceback(self):
+        """Test starting a traceback at a given location."""
+
+        try:
+            raise ValueError("Failed")
+        except ValueError as ex:
+            relocate_traceback(ex.__traceback__, 'other.feature', 1, 'Other')
+            hits = compile_template.cache_info().hits
+            relocated = relocate_traceback(
+                ex.__traceback__, 'some.feature', 1234, 'Scenario')
+
+        # The function giving the location is only compiled once
+        self.assertEqual(compile_template.cache_info().hits, hits + 1)
+
+        frame = traceback.extract_tb(relocated)[0]
+        self.assertEqual(
+            (frame.filename, frame.lineno, frame.name),
+            ('some.feature', 1234, 'Scenario'),
+        )
 
 
 class TestMultiManager(unittest.TestCase):
@@ -129,3 +239,52 @@ class TestMultiManager(unittest.TestCase):
                 as (args1, args2):
             self.assertEqual(args1, ('foo', 'bar'))
             self.assertEqual(args2, ('foo', 'bar'))
+
+    def test_async(self):
+        """
+        Test entering and exiting asynchronous context managers.
+        """
+
+        order = []
+
+        @asynccontextmanager
+        async def async_cm():
+            """An asynchronous context manager logging to a list."""
+            order.append('before async cm')
+            try:
+                yield 'from async cm'
+            except KeyError:
+                order.append('suppressed')
+            finally:
+                order.append('after async cm')
+
+        multi_cm = multi_manager(self.good_cm(order, 1), async_cm)
+
+        with multi_cm() as (ctx1, ctx2):
+            self.assertEqual(ctx1, 'from cm 1')
+            self.assertEqual(ctx2, 'from async cm')
+
+        with multi_cm():
+            raise KeyError
+
+        with self.assertRaises(ValueError):
+            with multi_cm():
+                raise ValueError
+
+        self.assertEqual(order, [
+            'before cm 1',
+            'before async cm',
+            'after async cm',
+            'after cm 1',
+        ] + [
+            'before cm 1',
+            'before async cm',
+            'suppressed',
+            'after async cm',
+            'after cm 1',
+        ] + [
+            'before cm 1',
+            'before async cm',
+            'after async cm',
+            'after cm 1',
+        ])
@@ -13,7 +13,9 @@ from builtins import zip
 
 # pylint:enable=redefined-builtin
 
-from aloe.parser import Feature, Scenario, Background
+from copy import copy
+
+from aloe.parser import Feature, Scenario, Background, parse_snippet
 from aloe.exceptions import AloeSyntaxError
 from tests.testing import named_temporary_file
 
@@ -527,6 +529,62 @@ def test_outline_steps():
             assert step, outline == None
 
 
+def test_compact_nodes():
+    """Test that the nodes only keep their attributes in slots."""
+
+    feature = Feature.from_string(FEATURE1)
+    scenario = feature.scenarios[0]
+    (step, _, _) = scenario.steps
+
+    assert not hasattr(step, "__dict__") or not step.__dict__
+    assert step.scenario is scenario
+    assert step.table[1][0] == "Matrix Revolutions"
+    # Tables are made of interned strings
+    assert step.table[2][2] is feature.scenarios[1].steps[0].table[1][2]
+
+    # Attributes not in the slots still work
+    step.custom = "custom"
+    assert step.custom == "custom"
+
+    with pytest.raises(AttributeError):
+        step.background  # pylint:disable=pointless-statement
+    assert step.container is scenario
+
+
+def test_outline_steps_copies():
+    """Test that the steps substituted for an outline don't share state."""
+
+    feature = Feature.from_string(FEATURE6)
+    scenario = feature.scenarios[0]
+    (template,) = scenario.steps
+    assert template.max_length
+
+    ((_, (first,)), (_, (second,))) = scenario.evaluated
+
+    assert first.sentence.endswith("damn big'")
+    assert second.sentence.endswith("within a table'")
+    assert first.filename is template.filename
+    # The memoized properties are not copied from the template
+    assert first.max_length > second.max_length
+
+
+def test_outline_copy():
+    """Test that copying an outline keeps its values and location."""
+
+    feature = Feature.from_string(FEATURE6)
+    outline = next(feature.scenarios[0].iter_outlines())
+
+    copied = copy(outline)
+
+    assert copied is not outline
+    assert copied == outline
+    assert list(copied.items()) == list(outline.items())
+    assert (copied.line, copied.col) == (outline.line, outline.col)
+
+    copied["extra"] = "value"
+    assert "extra" not in outline
+
+
 def test_can_parse_feature_description():
     """
     A feature object should have a description
@@ -906,3 +964,64 @@ def test_feature_first_scenario_tags_extraction():
 
     assert feature.scenarios[0].tags == ("onetag", "another", "$%^&even-weird_chars")
 
+
+
+def test_step_keyword():
+    """Test the keywords for each kind of step."""
+
+    feature = Feature.from_string(FEATURE1)
+    step = feature.scenarios[0].steps[0]
+
+    assert step.step_keyword("given") == "Given "
+    assert step.step_keyword("when") == "When "
+    assert step.step_keyword("then") == "Then "
+
+    # The dialect is only looked up once for each language
+    assert feature.dialect is Feature.from_string(FEATURE6).dialect
+
+    feature = Feature.from_string(FEATURE1.replace("Feature: Rent movies", "# language: fr\nFonctionnalité: Louer"))
+    assert feature.step_keywords["given"] == "Soit "
+
+
+@pytest.mark.parametrize(
+    "language,string",
+    [
+        ("en", "Given I have a step"),
+        ("en", "  When  I press   add  "),
+        ("en", "* I have a step"),
+        ("en", "But\tnot this one"),
+        ("fr", "Soit un pas"),
+        ("fr", "Etant donné qu'il y a un pas"),
+        ("ru", "Допустим, я ввожу число 50"),
+    ],
+)
+def test_parse_snippet_single_step(language, string):
+    """Test parsing a single step line without the Gherkin parser."""
+
+    # A multiline string goes through the Gherkin parser
+    assert parse_snippet(language, "scenario", string) == parse_snippet(language, "scenario", string + "\n")
+
+
+def test_parse_steps_from_string():
+    """Test parsing steps to run in the context of another."""
+
+    feature = Feature.from_string(FEATURE1)
+    context = feature.scenarios[0].steps[1]
+
+    (step,) = context.parse_steps_from_string("Given I have a step")
+    assert step.sentence == "Given I have a step"
+    assert step.scenario is context.scenario
+    assert step.feature is feature
+
+    (step, table_step) = context.parse_steps_from_string(
+        """
+        Given I have a step
+        And I have a table:
+            | a | b |
+        """
+    )
+    assert step.sentence == "Given I have a step"
+    assert table_step.table == (("a", "b"),)
+
+    with pytest.raises(AloeSyntaxError):
+        context.parse_steps_from_string('Given I have a multiline\n"""')
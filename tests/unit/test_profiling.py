@@ -0,0 +1,47 @@
+"""
+Test profiling the collection.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import time
+
+from aloe.profiling import CollectionProfiler
+
+
+def test_nested_stages():
+    """
+    Test the time of the nested stages is excluded from the outer ones.
+    """
+
+    profiler = CollectionProfiler()
+
+    inner = profiler.timed("compile", lambda: time.sleep(0.05))
+
+    def outer_function():
+        """Spend some time in the outer and the inner stage."""
+        time.sleep(0.02)
+        inner()
+        inner()
+
+    outer = profiler.timed("wrap", outer_function)
+
+    with profiler.collecting("one.feature"):
+        outer()
+    inner()
+
+    stages = profiler.by_file["one.feature"]
+    assert stages["compile"][1] == 2
+    assert stages["compile"][0] >= 0.1
+    assert stages["wrap"][1] == 1
+    assert 0.02 <= stages["wrap"][0] < 0.05
+
+    assert profiler.by_file[CollectionProfiler.other]["compile"][1] == 1
+    assert list(profiler.file_times) == ["one.feature"]
+
+    totals = {stage: (duration, calls) for stage, duration, calls in profiler.stages()}
+    assert totals["compile"][1] == 3
+    assert totals["parse"] == (0, 0)
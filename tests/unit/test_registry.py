@@ -10,8 +10,11 @@ from __future__ import absolute_import
 
 import unittest
 import pytest
+from mock import patch
 
-from aloe.registry import CallbackDecorator, CallbackDict, PriorityClass, StepDict
+from aloe.codegen import multi_manager
+
+from aloe.registry import CallbackDecorator, CallbackDict, PriorityClass, StepDict, literal_words
 from aloe.exceptions import StepLoadingError, undefined_step
 
 from tests.utils import appender, before_after
@@ -266,6 +269,191 @@ def test_unload_reload():
     assert_matches(steps, "My step 1", (step, ("1",), {}))
 
 
+def test_leftmost_match():
+    """
+    Test that the step matching the earliest in the sentence wins, and the
+    last registered one wins between equal matches.
+    """
+
+    def first():  # pylint:disable=missing-docstring
+        pass
+
+    def second():  # pylint:disable=missing-docstring
+        pass
+
+    def third():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.step(r"buy (\d+) apples")(first)
+    steps.step(r"I buy (\d+) apples")(second)
+    steps.step(r"I buy (\d+) apples")(third)
+
+    assert_matches(steps, "When I buy 3 apples", (third, ("3",), {}))
+
+    steps.step(r"When I (\w+) (\d+) apples")(first)
+    steps.step(r"When .*")(second)
+
+    assert_matches(steps, "When I buy 3 apples", (second, (), {}))
+
+
+def test_equal_match_last_registered():
+    """
+    Test that the last registered step wins between steps matching at the
+    same position, as sentences start with the step keyword.
+    """
+
+    def apples():  # pylint:disable=missing-docstring
+        pass
+
+    def anything():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.step(r"I have (\d+) apples")(apples)
+    steps.step(r"I have (.*)")(anything)
+
+    assert_matches(steps, "Given I have 3 apples", (anything, ("3 apples",), {}))
+
+    steps.step(r"I have (\d+) apples")(apples)
+    assert_matches(steps, "Given I have 3 apples", (anything, ("3 apples",), {}))
+
+    anything.unregister()  # pylint:disable=no-member
+    assert_matches(steps, "Given I have 3 apples", (apples, ("3",), {}))
+
+
+def test_literal_words():
+    """
+    Test finding the words a step sentence regex requires.
+    """
+
+    steps = StepDict()
+
+    def words(sentence):
+        """The literal words of a step sentence."""
+        return literal_words(steps._assert_is_step(sentence, None))  # pylint:disable=protected-access
+
+    assert words(r"I go to the shops") == ("go", "to", "the", "shops")
+    assert words(r"^I go (\w+) the shop.$") == ("i", "go", "the")
+    assert words(r"Given I have (\d+) (?:apples|oranges)") == ("i", "have")
+    assert words(r"word\b is here") == ("is", "here")
+    assert words(r"(?:one|two) three") == ("three",)
+    assert words(r"one|two") == ()
+    assert words(r"Я иду в магазин") == ()
+
+
+def test_index_non_ascii():
+    """
+    Test that sentences with characters matching ASCII ones when ignoring case
+    still find their steps.
+    """
+
+    def func():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.step(r"I kick the ball")(func)
+
+    # KELVIN SIGN matches 'k' case-insensitively
+    assert_matches(steps, "I \u212aick the ball", (func, (), {}))
+    assert_no_match(steps, "I lick the ball")
+
+
+def test_index_unload_replace():
+    """
+    Test that the index follows loading, replacing and unloading steps.
+    """
+
+    def func1():  # pylint:disable=missing-docstring
+        pass
+
+    def func2():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.step(r"a (\w+) step")(func1)
+    steps.step(r"a special step")(func2)
+
+    assert_matches(steps, "a special step", (func2, (), {}))
+
+    # Replacing a step keeps its priority
+    steps.step(r"a (\w+) step")(func2)
+    assert_matches(steps, "a special step", (func2, (), {}))
+
+    steps.unload(r"a (\w+) step$")
+    steps.step(r"a (\w+) step")(func1)
+    assert_matches(steps, "a special step", (func1, ("special",), {}))
+
+    steps.unload(r"a (\w+) step$")
+    assert_matches(steps, "a special step", (func2, (), {}))
+
+    steps.clear()
+    assert_no_match(steps, "a special step")
+
+
+def test_match_cache():
+    """
+    Test caching the matched steps by sentence.
+    """
+
+    def func1():  # pylint:disable=missing-docstring
+        pass
+
+    def func2():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.cache_size = 2
+    steps.step(r"I have (\d+) apples")(func1)
+
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+    assert steps.cache_info() == (1, 1, 2, 1)
+
+    # Only the most recently used sentences are kept
+    assert_matches(steps, "I have 2 apples", (func1, ("2",), {}))
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+    assert_matches(steps, "I have 3 apples", (func1, ("3",), {}))
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+    assert_matches(steps, "I have 2 apples", (func1, ("2",), {}))
+    assert steps.cache_info() == (3, 4, 2, 2)
+
+    # Changing the steps invalidates the cache
+    steps.step(r"I have (?P<count>\d+) apples")(func2)
+    assert steps.cache_info().currsize == 0
+    assert_matches(steps, "I have 1 apples", (func2, (), {"count": "1"}))
+
+    func2.unregister()  # pylint:disable=no-member
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+
+    steps.unload(r"I have (\d+) apples$")
+    assert_no_match(steps, "I have 1 apples")
+
+    steps.step(r"I have (\d+) apples")(func1)
+    assert_matches(steps, "I have 1 apples", (func1, ("1",), {}))
+    steps.clear()
+    assert_no_match(steps, "I have 1 apples")
+
+
+def test_definition():
+    """
+    Test finding the definition matching a step.
+    """
+
+    def func():  # pylint:disable=missing-docstring
+        pass
+
+    steps = StepDict()
+    steps.step(r"I have (\d+) apples")(func)
+    steps.step(r"I have (\d+) pears")(func)
+
+    regex, step_func = steps.definition(FakeStep("I have 1 pears"))
+    assert step_func is func
+    assert regex.pattern == r"I have (\d+) pears$"
+
+    assert steps.definition(FakeStep("I have 1 plums")) == (None, undefined_step)
+
+
 class CallbackDictTest(unittest.TestCase):
     """
     Test callback dictionary.
@@ -312,6 +500,43 @@ class CallbackDictTest(unittest.TestCase):
             ],
         )
 
+    def test_wrap_cache(self):
+        """
+        Test reusing the combined hooks until the callbacks change.
+        """
+
+        sequence = []
+
+        self.before.all(appender(sequence, "before"))
+
+        with patch("aloe.registry.multi_manager", wraps=multi_manager) as manager:
+            self.callbacks.wrap("all", appender(sequence, "wrapped1"))()
+            self.callbacks.wrap("all", appender(sequence, "wrapped2"))()
+            self.callbacks.before_after("all")
+            self.assertEqual(manager.call_count, 1)
+
+            self.after.all(appender(sequence, "after"))
+            self.callbacks.wrap("all", appender(sequence, "wrapped3"))()
+            self.assertEqual(manager.call_count, 2)
+
+            self.callbacks.clear()
+            self.callbacks.wrap("all", appender(sequence, "wrapped4"))()
+            self.assertEqual(manager.call_count, 3)
+
+        self.assertEqual(
+            sequence,
+            [
+                ("before",),
+                ("wrapped1",),
+                ("before",),
+                ("wrapped2",),
+                ("before",),
+                ("wrapped3",),
+                ("after",),
+                ("wrapped4",),
+            ],
+        )
+
     def test_before_after(self):
         """
         Test before_after.
@@ -558,3 +558,45 @@ def test_scenario_with_hash_within_single_quotes():
     assert step1.sentence == "Given I am logged in on twitter"
     assert step2.sentence == "When I search for the hashtag '#hammer'"
 
+
+
+def test_outline_substitution_placeholders():
+    """
+    Outline substitution should leave unknown placeholders alone and not
+    substitute into the replaced values.
+    """
+
+    scenario = parse_scenario(
+        """
+Scenario Outline: Placeholders
+    Given I have <a> and <b> and <unknown> and <<a>> and <a
+    And I have <a>:
+        | <a>    | <> |
+        | plain  | <b> |
+
+    Examples:
+        | a   | b   |
+        | <b> | 2   |
+"""
+    )
+
+    (first, second) = solved_steps(scenario)
+    assert first.sentence == "Given I have <b> and 2 and <unknown> and <<b>> and <a"
+    assert second.table == (("<b>", "<>"), ("plain", "2"))
+
+
+def test_scenario_outline_rows():
+    """
+    The outline rows are stored compactly and the outlines built from them.
+    """
+
+    scenario = parse_scenario(OUTLINED_SCENARIO_WITH_MORE_THAN_ONE_EXAMPLES_BLOCK)
+
+    assert len(scenario.outline_rows) == len(scenario.outlines)
+    for row, outline in zip(scenario.outline_rows, scenario.outlines):
+        assert outline == dict(zip(row.keys, row.values))
+        assert outline.line == row.line
+
+    # Once built, the same outlines are used for evaluating the steps
+    assert tuple(outline for outline, _ in scenario.evaluated) == scenario.outlines
+    assert all(a is b for a, b in zip(scenario.iter_outlines(), scenario.outlines))
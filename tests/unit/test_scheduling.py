@@ -0,0 +1,97 @@
+"""
+Test balancing the scenarios across xdist workers.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import pytest
+from mock import patch
+
+from pytest_eucalyptus import scheduling
+from pytest_eucalyptus.scheduling import DURATIONS_KEY, feature_chunks, make_scheduler, save_durations
+
+
+class FakeCache(dict):
+    """A fake pytest cache."""
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class FakeConfig(object):
+    """A fake pytest config with a cache."""
+
+    def __init__(self, rootdir, durations):
+        self.rootdir = rootdir
+        self.cache = FakeCache({DURATIONS_KEY: durations})
+
+
+def test_feature_chunks():
+    """
+    Test splitting the tests into chunks of scenarios of the same feature by
+    their durations.
+    """
+
+    collection = ["a::A::1", "a::A::2", "b::B::1", "b::B::2", "b::B::3", "c::C::1"]
+
+    # Without durations, all the tests take the same time
+    assert feature_chunks(collection, {}, 2) == [[2, 3, 4], [0, 1], [5]]
+    assert feature_chunks(collection, {}, 1) == [[2, 3, 4], [0, 1], [5]]
+
+    # Only the features longer than the share of a worker are split
+    durations = {"a::A::1": 4.0, "a::A::2": 4.0, "b::B::1": 1.0, "b::B::2": 1.0, "b::B::3": 1.0, "gone": 100.0}
+    assert feature_chunks(collection, durations, 2) == [[0], [1], [2, 3, 4], [5]]
+    assert feature_chunks(collection, durations, 1) == [[0, 1], [2, 3, 4], [5]]
+
+    # A feature is split in consecutive runs of about the same time
+    collection = ["a::A::{}".format(index) for index in range(6)] + ["b::B::1"]
+    durations = dict.fromkeys(collection, 1.0)
+    assert feature_chunks(collection, durations, 2) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert feature_chunks(collection, durations, 3) == [[0, 1], [2, 3], [4, 5], [6]]
+
+
+def test_save_durations(tmpdir):
+    """
+    Test forgetting the durations of the tests no longer collected.
+    """
+
+    tmpdir.join("kept.feature").write("")
+    tmpdir.join("other.feature").write("")
+
+    config = FakeConfig(
+        tmpdir,
+        {
+            "kept.feature::A::1": 1.0,
+            "kept.feature::A::renamed": 2.0,
+            "other.feature::B::1": 3.0,
+            "deleted.feature::C::1": 4.0,
+        },
+    )
+
+    save_durations(config, {"kept.feature::A::2": 5.0}, {"kept.feature::A::1", "kept.feature::A::2"})
+
+    # The files not collected keep their durations unless they are gone
+    assert config.cache[DURATIONS_KEY] == {
+        "kept.feature::A::1": 1.0,
+        "kept.feature::A::2": 5.0,
+        "other.feature::B::1": 3.0,
+    }
+
+
+def test_make_scheduler_fallback():
+    """
+    Test falling back to the default scheduling if pytest-xdist changed the
+    state the scheduling relies on.
+    """
+
+    pytest.importorskip("xdist")
+
+    config = FakeConfig(None, {})
+    config.getvalue = lambda name: {"tx": ["popen"] * 2, "numprocesses": 2}.get(name)
+
+    with patch.object(scheduling, "LOAD_SCHEDULING_STATE", scheduling.LOAD_SCHEDULING_STATE + ("gone",)):
+        with pytest.warns(UserWarning, match="missing LoadScheduling.gone"):
+            assert make_scheduler(config) is None
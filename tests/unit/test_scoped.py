@@ -0,0 +1,125 @@
+"""
+Test the scoped world.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import threading
+
+import pytest
+
+from aloe.scoped import ScopedWorld
+
+
+def test_scopes():
+    """Test the attributes are discarded at the end of their scope."""
+
+    world = ScopedWorld()
+    world.session = "session"
+
+    world.begin_feature()
+    world.feature = "feature"
+
+    world.begin_scenario()
+    world.scenario = "scenario"
+    world.session = "changed"
+    assert (world.session, world.feature, world.scenario) == ("changed", "feature", "scenario")
+
+    del world.feature
+    assert not hasattr(world, "feature")
+    with pytest.raises(AttributeError):
+        del world.feature
+
+    world.end_scenario()
+    assert (world.session, world.feature) == ("session", "feature")
+    assert not hasattr(world, "scenario")
+
+    world.end_feature()
+    assert world.session == "session"
+    assert not hasattr(world, "feature")
+
+    world.clear()
+    assert not hasattr(world, "session")
+
+
+def test_snapshot():
+    """Test the outer attributes are copied into the scenario on access."""
+
+    world = ScopedWorld(snapshot=True)
+    world.items = []
+    world.lock = threading.Lock()
+
+    world.begin_scenario()
+    world.items.append(1)
+    assert world.items == [1]
+    assert world.lock is world.lock
+    world.end_scenario()
+
+    assert world.items == []
+
+
+def test_threads():
+    """Test the scenarios in different threads don't see each other."""
+
+    world = ScopedWorld()
+    world.shared = "shared"
+
+    started = threading.Barrier(2)
+    seen = {}
+
+    def run_scenario(name):
+        """Set an attribute and check it after the other thread did."""
+
+        world.begin_scenario()
+        world.name = name
+        started.wait()
+        started.wait()
+        seen[name] = (world.name, world.shared)
+        world.end_scenario()
+
+    threads = [threading.Thread(target=run_scenario, args=(name,)) for name in ("one", "two")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == {"one": ("one", "shared"), "two": ("two", "shared")}
+    assert not hasattr(world, "name")
+
+
+def test_feature_threads():
+    """Test the threads running the scenarios of a feature share its scope."""
+
+    world = ScopedWorld(snapshot=True)
+    world.begin_feature("feature")
+    world.items = ["feature"]
+
+    seen = {}
+
+    def run_scenario(name, feature):
+        """Read the feature attributes in a scenario."""
+
+        world.begin_scenario(feature)
+        if hasattr(world, "items"):
+            world.items.append(name)
+        seen[name] = getattr(world, "items", None)
+        world.end_scenario()
+
+    threads = [
+        threading.Thread(target=run_scenario, args=("one", "feature")),
+        threading.Thread(target=run_scenario, args=("two", None)),
+        threading.Thread(target=run_scenario, args=("three", "other")),
+    ]
+    for thread in threads:
+        thread.start()
+        thread.join()
+
+    # Snapshots copy the feature attributes too
+    assert seen == {"one": ["feature", "one"], "two": ["feature", "two"], "three": None}
+    assert world.items == ["feature"]
+
+    world.end_feature("feature")
+    assert not hasattr(world, "items")
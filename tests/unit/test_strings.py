@@ -71,3 +71,40 @@ def test_column_width_w_number_and_char():
     """strings.column_width_w_number_and_char"""
 
     assert strings.get_terminal_width("%s%c" % ("4209", 0x4209)) == 6
+
+
+def test_terminal_width_ascii():
+    """strings.get_terminal_width with only ASCII characters"""
+
+    assert strings.get_terminal_width("") == 0
+    assert strings.get_terminal_width("plain text\t|") == 12
+
+
+def test_terminal_width_mixed():
+    """strings.get_terminal_width with ASCII, narrow and wide characters"""
+
+    assert strings.get_terminal_width("naïve 数据表 ｘ") == 15
+    # Measured again from the cached widths
+    assert strings.get_terminal_width("naïve 数据表 ｘ") == 15
+    assert strings.CHAR_WIDTHS["数"] == 2
+    assert strings.CHAR_WIDTHS["ï"] == 1
+
+
+def test_measure_table():
+    """strings.measure_table"""
+
+    table = [["name", "数据"], ["Falcão", ""], ["x", "y"]]
+
+    assert strings.measure_table(table) == ([[4, 4], [6, 0], [1, 1]], [6, 4])
+
+
+def test_represent_table_wide():
+    """Test representing a table with double-wide characters"""
+
+    table = [["word", "count"], ["テスト", 3], ["naïve", 12]]
+
+    assert strings.represent_table(table) == (
+        "| word   | count |\n"
+        "| テスト | 3     |\n"
+        "| naïve  | 12    |"
+    )
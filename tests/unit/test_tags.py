@@ -0,0 +1,62 @@
+"""
+Test tag expressions.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import pytest
+
+from aloe.tags import TagExpression
+
+
+@pytest.mark.parametrize(
+    "expressions,tags,expected",
+    [
+        (("@wip",), ("wip",), True),
+        (("@wip",), ("slow",), False),
+        (("wip",), ("wip", "slow"), True),
+        (("~@slow",), ("wip",), True),
+        (("~@slow",), ("wip", "slow"), False),
+        (("not @slow",), (), True),
+        (("@wip,@slow",), ("slow",), True),
+        (("@wip or @slow",), ("fast",), False),
+        (("@wip and @slow",), ("wip",), False),
+        (("@wip and @slow",), ("wip", "slow"), True),
+        (("@wip", "~@slow"), ("wip",), True),
+        (("@wip", "~@slow"), ("wip", "slow"), False),
+        (("@a or @b and @c",), ("a",), True),
+        (("(@a or @b) and @c",), ("a",), False),
+        (("not (@a or @b)",), ("c",), True),
+        (("NOT @a AND @b",), ("b",), True),
+        (("",), ("anything",), True),
+    ],
+)
+def test_tag_expression(expressions, tags, expected):
+    """
+    Test matching tags with expressions.
+    """
+
+    assert TagExpression(*expressions).matches(tags) == expected
+
+
+def test_empty_tag_expression():
+    """
+    Test that no expressions select everything.
+    """
+
+    assert not TagExpression()
+    assert not TagExpression("", " ")
+    assert TagExpression("@wip")
+
+
+@pytest.mark.parametrize("expression", ["@a and", "(@a or @b", "@a @b", "or @a", "@", "@a)"])
+def test_invalid_tag_expression(expression):
+    """
+    Test reporting invalid expressions.
+    """
+
+    with pytest.raises(ValueError):
+        TagExpression(expression)
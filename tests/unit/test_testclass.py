@@ -0,0 +1,183 @@
+"""
+Test the base test class helpers.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import traceback
+
+import pytest
+from mock import patch
+
+from aloe.codegen import make_function
+from aloe.exceptions import NoDefinitionFound
+from aloe.registry import STEP_REGISTRY
+from aloe.testclass import BindingPlan, TestCase
+
+FEATURE = """
+Feature: Lazy
+    Background:
+        Given I have a background
+
+    Scenario: Plain
+        Given I have a step
+
+    Scenario Outline: Outline
+        Given I have <count> steps
+
+        Examples:
+            | count |
+            | 1     |
+            | 2     |
+"""
+
+
+class FakeRequest(object):
+    """A fake pytest request providing the given fixtures."""
+
+    def __init__(self, **fixtures):
+        self.fixtures = fixtures
+        self._fixturemanager = self
+        self._arg2fixturedefs = {name: () for name in fixtures}
+
+    def getfixturevalue(self, name):
+        """Return the fixture value."""
+        return self.fixtures[name]
+
+
+def test_binding_plan():
+    """
+    Test combining the fixtures and the captured groups for a step.
+    """
+
+    def step(self, first, tmpdir, second):  # pylint:disable=missing-docstring,unused-argument
+        pass
+
+    plan = BindingPlan(step, {})
+    assert plan.params == ("first", "tmpdir", "second")
+
+    request = FakeRequest(tmpdir="/tmp", unused="unused")
+    assert plan.bind(request, ("1", "2"), {}) == {"first": "1", "tmpdir": "/tmp", "second": "2"}
+
+    # Without a request, all the parameters are captured groups
+    assert plan.bind(None, ("1", "2", "3"), {}) == {"first": "1", "tmpdir": "2", "second": "3"}
+
+    plan = BindingPlan(step, {"second": "2"})
+    assert plan.bind(request, ("1",), {"second": "2"}) == {"first": "1", "tmpdir": "/tmp", "second": "2"}
+
+    # Fixtures take precedence over named groups
+    plan = BindingPlan(step, {"tmpdir": "here"})
+    assert plan.bind(request, ("1", "2"), {"tmpdir": "here"}) == {"first": "1", "tmpdir": "/tmp", "second": "2"}
+
+
+def test_lazy_from_file(tmpdir):
+    """
+    Test that the steps are only prepared when the scenarios are run.
+    """
+
+    feature = tmpdir.join("lazy.feature")
+    feature.write(FEATURE)
+
+    with patch.object(TestCase, "prepare_step", wraps=TestCase.prepare_step) as prepare_step:
+        testclass = TestCase.from_file(str(feature), lazy=True)
+        assert prepare_step.call_count == 0
+
+        assert testclass.scenarios == ["Plain", "Outline: Example 1", "Outline: Example 2"]
+        assert [method.scenario_index for method in map(testclass.__dict__.get, testclass.scenarios)] == [1, 2, 2]
+
+        # The steps aren't defined
+        with pytest.raises(NoDefinitionFound):
+            testclass("Outline: Example 2").debug()
+        # The background and the outline steps
+        assert prepare_step.call_count == 2
+
+        with pytest.raises(NoDefinitionFound):
+            testclass("Outline: Example 2").debug()
+        assert prepare_step.call_count == 2
+
+        # The outline examples are only built for running them
+        scenario = testclass.feature.scenarios[1]
+        assert "outlines" not in scenario.__dict__
+
+        # Released methods are constructed again when run
+        getattr(testclass, "Outline: Example 2").release()
+        with pytest.raises(NoDefinitionFound):
+            testclass("Outline: Example 2").debug()
+        assert prepare_step.call_count == 3
+
+
+def test_from_file_indices(tmpdir):
+    """
+    Test that only the scenarios with the given indices are generated.
+    """
+
+    feature = tmpdir.join("indices.feature")
+    feature.write(FEATURE)
+
+    with patch.object(TestCase, "prepare_step", wraps=TestCase.prepare_step) as prepare_step:
+        testclass = TestCase.from_file(str(feature), indices=frozenset((2,)))
+        assert testclass.scenarios == ["Outline: Example 1", "Outline: Example 2"]
+        # The background and the outline steps
+        assert prepare_step.call_count == 3
+
+    testclass = TestCase.from_file(str(feature), indices=frozenset((3,)))
+    assert testclass.scenarios == []
+
+
+def test_closure_step_runner(tmpdir):
+    """
+    Test running the steps in a loop, failing at the lines of the steps.
+    """
+
+    feature = tmpdir.join("closure.feature")
+    feature.write(FEATURE)
+
+    calls = []
+
+    def have_steps(self, count):
+        """Record the step, failing for two steps."""
+        calls.append((self.sentence, self.test is not None))
+        assert count != "2"
+
+    steps = {
+        r"I have a background": lambda step: calls.append((step.sentence, step.test is not None)),
+        r"I have a step": lambda step: calls.append((step.sentence, step.test is not None)),
+        r"I have (\d+) steps": have_steps,
+    }
+    registered = dict(STEP_REGISTRY.steps)
+    for sentence, func in steps.items():
+        STEP_REGISTRY.load(sentence, func)
+
+    try:
+        with patch("aloe.testclass.make_function", wraps=make_function) as patched_make_function:
+            testclass = TestCase.from_file(str(feature), step_runner="closure")
+            assert patched_make_function.call_count == 0
+
+        assert testclass.step_runner == "closure"
+        assert TestCase.step_runner == "compiled"
+
+        testclass("Outline: Example 1").debug()
+        assert calls == [("Given I have a background", True), ("Given I have 1 steps", True)]
+
+        with pytest.raises(AssertionError) as excinfo:
+            testclass("Outline: Example 2").debug()
+
+        locations = [
+            (frame.filename, frame.lineno, frame.name) for frame in traceback.extract_tb(excinfo.value.__traceback__)
+        ]
+        assert (str(feature), 15, "Outline: Example 2") in locations
+        assert (str(feature), 10, "Outline") in locations
+        assert locations.index((str(feature), 15, "Outline: Example 2")) < locations.index(
+            (str(feature), 10, "Outline")
+        )
+
+        # Steps are no longer marked as running
+        assert all(not step.test for scenario in testclass.feature.scenarios for step in scenario.steps)
+    finally:
+        for func in steps.values():
+            STEP_REGISTRY.unload_func(func)
+
+    assert STEP_REGISTRY.steps == registered
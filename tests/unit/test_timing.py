@@ -0,0 +1,222 @@
+"""
+Test timing the steps.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import json
+import re
+from array import array
+
+import pytest
+from mock import patch
+
+from aloe.registry import CallbackDict, StepDict
+from aloe.timing import StepDefinition, StepTimer, StepTimingWriter, percentile
+
+
+class FakeStep(object):
+    """A fake step object to time."""
+
+    def __init__(self, sentence, line):
+        self.sentence = sentence
+        self.filename = "fake.feature"
+        self.line = line
+
+
+def test_percentile():
+    """Test the nearest-rank percentiles."""
+
+    durations = [float(duration) for duration in range(1, 21)]
+
+    assert percentile(durations, 0.5) == 10
+    assert percentile(durations, 0.95) == 19
+    assert percentile(durations, 1) == 20
+    assert percentile([3.0], 0.5) == 3
+
+
+def test_step_timer():
+    """Test collecting the step durations."""
+
+    steps = StepDict()
+
+    @steps.step(r"I have (\d+) apples")
+    def apples(self, count):  # pylint:disable=missing-docstring,unused-argument
+        pass
+
+    @steps.step(r"I fail")
+    def fail(self):  # pylint:disable=missing-docstring,unused-argument
+        raise AssertionError("failed")
+
+    registry = CallbackDict()
+    timer = StepTimer()
+    timer.install(registry)
+
+    with patch("aloe.timing.STEP_REGISTRY", steps), patch("aloe.timing.perf_counter", side_effect=range(100)):
+        for line, sentence in ((1, "I have 1 apples"), (2, "I have 2 apples"), (1, "I have 1 apples")):
+            step = FakeStep(sentence, line)
+            registry.wrap("step", apples, step)(step, "1")
+
+        step = FakeStep("I fail", 3)
+        with pytest.raises(AssertionError):
+            registry.wrap("step", fail, step)(step)
+
+    (slowest, failed) = timer.slowest()
+    assert slowest.key.function is apples
+    assert slowest.key.pattern == r"I have (\d+) apples$"
+    assert slowest[1:] == (3, 3, 1, 1, 1)
+    assert failed.key.function is fail
+    assert failed.count == 1
+
+    assert [(stat.key, stat.count) for stat in timer.slowest(by="location")] == [
+        (("fake.feature", 1), 2),
+        (("fake.feature", 2), 1),
+        (("fake.feature", 3), 1),
+    ]
+
+    (header, line) = timer.summary(1)
+    assert header.split() == ["total", "count", "p50", "p95", "max", "definition"]
+    assert line.split()[:5] == ["3.000s", "3", "1.000s", "1.000s", "1.000s"]
+    assert re.search(r"  I have \(\\d\+\) apples\$ \(apples at .*test_timing\.py:\d+\)$", line)
+
+    # Uninstalled timers don't record anything
+    timer.uninstall(registry)
+    step = FakeStep("I have 1 apples", 1)
+    registry.wrap("step", apples, step)(step, "1")
+    assert timer.slowest()[0].count == 3
+
+
+def test_step_timer_prepared_definition():
+    """Test the steps are timed by the definition they were prepared with."""
+
+    steps = StepDict()
+
+    @steps.step(r"I have (\d+) apples")
+    def apples(self, count):  # pylint:disable=missing-docstring,unused-argument
+        pass
+
+    registry = CallbackDict()
+    timer = StepTimer()
+    timer.install(registry)
+
+    step = FakeStep("I have 1 apples", 1)
+    func, _, _, regex = steps.match_definition(step)
+    step.definition = (regex, func)
+    cache_info = steps.cache_info()
+
+    with patch("aloe.timing.STEP_REGISTRY", steps):
+        for _ in range(3):
+            registry.wrap("step", apples, step)(step, "1")
+
+    # The registry is not consulted again
+    assert steps.cache_info() == cache_info
+    (stat,) = timer.slowest()
+    assert stat.key.function is apples
+    assert stat.count == 3
+
+
+def test_step_timer_merge():
+    """Test adding the durations recorded by other timers."""
+
+    def apples():  # pylint:disable=missing-docstring
+        pass
+
+    timers = [StepTimer() for _ in range(3)]
+    for index, timer in enumerate(timers[1:], 1):
+        timer.by_definition[StepDefinition(apples, r"I have (\d+) apples$")] = array("d", (index, index))
+        timer.by_location[("fake.feature", index)] = array("d", (index,))
+
+    # Exported as basic types, like sent by xdist workers
+    for timer in timers[1:]:
+        timers[0].merge(json.loads(json.dumps(timer.export())))
+
+    (stat,) = timers[0].slowest()
+    assert stat[1:] == (4, 6, 1, 2, 2)
+    assert str(stat.key) == str(StepDefinition(apples, r"I have (\d+) apples$"))
+    assert [(stat.key, stat.total) for stat in timers[0].slowest(by="location")] == [
+        (("fake.feature", 2), 2),
+        (("fake.feature", 1), 1),
+    ]
+
+
+def test_step_timing_writer(tmpdir):
+    """Test writing the step durations as JSON Lines."""
+
+    steps = StepDict()
+
+    @steps.step(r"I have (\d+) apples")
+    def apples(self, count):  # pylint:disable=missing-docstring,unused-argument
+        pass
+
+    timings = tmpdir.join("timings.jsonl")
+
+    registry = CallbackDict()
+    writer = StepTimingWriter(timings.strpath, worker="gw1")
+    writer.buffer_size = 2
+    writer.install(registry)
+
+    with patch("aloe.timing.STEP_REGISTRY", steps):
+        for line in range(1, 4):
+            step = FakeStep("I have {} apples".format(line), line)
+            registry.wrap("step", apples, step)(step, "1")
+
+            # The records are written in batches
+            assert len(timings.readlines()) == line // 2 * 2
+
+    writer.uninstall(registry)
+    writer.close()
+
+    records = [json.loads(line) for line in timings.readlines()]
+    assert [record["sentence"] for record in records] == ["I have 1 apples", "I have 2 apples", "I have 3 apples"]
+    assert set(records[0]) == {"feature", "line", "sentence", "definition", "function", "duration", "outcome", "worker"}
+    assert records[2]["line"] == 3
+    assert records[2]["definition"] == r"I have (\d+) apples$"
+    assert records[2]["outcome"] == "passed"
+    assert records[2]["worker"] == "gw1"
+
+
+class ShortWrites(object):
+    """A raw file writing at most a few bytes at a time."""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        """Write the first bytes of the data."""
+        self.data += bytes(data[:7])
+        return len(data[:7])
+
+    def close(self):
+        """Nothing to close."""
+
+
+def test_step_timing_writer_short_writes(tmpdir):
+    """Test the batches are written whole even if the file takes them in parts."""
+
+    steps = StepDict()
+
+    @steps.step(r"I have (\d+) apples")
+    def apples(self, count):  # pylint:disable=missing-docstring,unused-argument
+        pass
+
+    registry = CallbackDict()
+    writer = StepTimingWriter(tmpdir.join("timings.jsonl").strpath)
+    writer.file.close()
+    writer.file = ShortWrites()
+    writer.install(registry)
+
+    for line in range(1, 4):
+        step = FakeStep("I have {} apples".format(line), line)
+        func, _, _, regex = steps.match_definition(step)
+        step.definition = (regex, func)
+        registry.wrap("step", apples, step)(step, "1")
+
+    writer.uninstall(registry)
+    writer.close()
+
+    records = [json.loads(line) for line in writer.file.data.decode("utf-8").splitlines()]
+    assert [record["line"] for record in records] == [1, 2, 3]
+    assert records[0]["definition"] == r"I have (\d+) apples$"
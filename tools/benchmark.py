@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Benchmark parsing, step matching, code generation, collection and running of
+a synthetic corpus of features.
+
+Each phase is timed separately, repeated and the best time kept. The results
+are written as JSON and can be compared with a baseline from another release:
+
+    python tools/benchmark.py --output new.json --baseline old.json
+
+Only the public API is used, and the options missing from the installed
+release are left out, so that the baseline can be produced by running this
+script against an older release.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import argparse
+import contextlib
+import inspect
+import io
+import json
+import os
+import platform
+import runpy
+import shutil
+import sys
+import tempfile
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from time import time as perf_counter
+
+import pytest
+
+import pytest_eucalyptus
+from aloe.parser import Feature
+from aloe.registry import STEP_REGISTRY
+from aloe.testclass import TestCase, TestFeature
+
+from corpus import DEFAULT_SIZE, CorpusSize, write_corpus
+
+PHASES = ("parse", "match", "codegen", "collection", "run")
+
+
+@contextlib.contextmanager
+def parsed_once(feature_class):
+    """Make the feature class parse every file only once."""
+
+    original = vars(feature_class).get("from_file")
+    from_file = feature_class.from_file
+    parsed = {}
+
+    def parse_once(cls, filename, *args, **kwargs):
+        """The parsed feature, parsing it the first time."""
+
+        try:
+            return parsed[filename]
+        except KeyError:
+            feature = parsed[filename] = from_file(filename, *args, **kwargs)
+            return feature
+
+    feature_class.from_file = classmethod(parse_once)
+    try:
+        yield
+    finally:
+        if original is None:
+            del feature_class.from_file
+        else:
+            feature_class.from_file = original
+
+
+def best_time(function, repeat):
+    """The shortest time taken by the function in the repeats, and its result."""
+
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        result = function()
+        times.append(perf_counter() - start)
+    return min(times), result
+
+
+def run_pytest(directory, *args):
+    """Run pytest in-process on the corpus, hiding the output."""
+
+    with io.open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return pytest.main(
+            ["-p", "pytest_eucalyptus", "-p", "no:cacheprovider", "--rootdir", directory, directory] + list(args)
+        )
+
+
+def benchmark(directory, filenames, repeat, step_runner="compiled"):
+    """Time all the phases on the corpus, returning the results by phase."""
+
+    results = {}
+
+    # Only pass the step runner to the releases supporting it
+    codegen_kwargs = {}
+    runner_args = []
+    if step_runner != "compiled":
+        if "step_runner" not in inspect.signature(TestCase.from_file).parameters:
+            raise RuntimeError("The installed release does not support the {} step runner".format(step_runner))
+        codegen_kwargs["step_runner"] = step_runner
+        runner_args = ["--aloe-step-runner", step_runner]
+
+    runpy.run_path(os.path.join(directory, "features", "conftest.py"))
+
+    def parse():
+        return [Feature.from_file(filename) for filename in filenames]
+
+    results["parse"], features = best_time(parse, repeat)
+
+    steps = [step for feature in features if feature.background for step in feature.background.steps]
+    for feature in features:
+        for scenario in feature.scenarios:
+            # Scenarios without examples have no evaluated steps
+            evaluated = [step for _, outline_steps in scenario.evaluated for step in outline_steps]
+            steps += evaluated or scenario.steps
+
+    # Match without the cache of the sentences, if the release has one
+    match_sentence = getattr(STEP_REGISTRY, "match_sentence", None)
+
+    def match():
+        for step in steps:
+            if match_sentence is not None:
+                match_sentence(step.sentence)
+            else:
+                STEP_REGISTRY.match_step(step)
+        return len(steps)
+
+    results["match"], _ = best_time(match, repeat)
+
+    # Generate the test classes with the parsing and matching already done
+    with parsed_once(TestFeature):
+
+        def codegen():
+            return [TestCase.from_file(filename, **codegen_kwargs) for filename in filenames]
+
+        codegen()
+        results["codegen"], _ = best_time(codegen, repeat)
+
+    results["collection"], exit_code = best_time(
+        lambda: run_pytest(directory, "--collect-only", "-q", *runner_args), repeat
+    )
+    if exit_code != 0:
+        raise RuntimeError("Collecting the corpus failed with exit code {}".format(exit_code))
+
+    results["run"], exit_code = best_time(lambda: run_pytest(directory, "-q", *runner_args), repeat)
+    if exit_code != 0:
+        raise RuntimeError("Running the corpus failed with exit code {}".format(exit_code))
+
+    counts = {"features": len(features), "scenarios": sum(len(feature.scenarios) for feature in features)}
+    counts["steps"] = len(steps)
+
+    return results, counts
+
+
+def compare(results, baseline):
+    """The lines of a table comparing the phase times with a baseline."""
+
+    lines = ["{:<12} {:>10} {:>10} {:>8}".format("phase", "baseline", "current", "ratio")]
+    for phase in PHASES:
+        current = results["phases"].get(phase)
+        previous = baseline.get("phases", {}).get(phase)
+        if current is None or previous is None:
+            continue
+        lines.append(
+            "{:<12} {:>9.4f}s {:>9.4f}s {:>7.2f}x".format(
+                phase, previous, current, current / previous if previous else 0
+            )
+        )
+    return lines
+
+
+def main(argv=None):
+    """Generate a corpus, benchmark it and write the results."""
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    for field in CorpusSize._fields:
+        parser.add_argument(
+            "--" + field.replace("_", "-"),
+            type=int,
+            default=getattr(DEFAULT_SIZE, field),
+            help="default: %(default)s",
+        )
+    parser.add_argument(
+        "--step-runner", choices=("compiled", "closure"), default="compiled", help="default: %(default)s"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="times to run each phase (default: %(default)s)")
+    parser.add_argument("--directory", help="write the corpus here and keep it (default: a temporary directory)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    args = parser.parse_args(argv)
+
+    size = CorpusSize(*(getattr(args, field) for field in CorpusSize._fields))
+
+    directory = args.directory or tempfile.mkdtemp(prefix="aloe-benchmark-")
+    try:
+        filenames = write_corpus(os.path.abspath(directory), size)
+        phases, counts = benchmark(os.path.abspath(directory), filenames, args.repeat, args.step_runner)
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    results = {
+        "version": pytest_eucalyptus.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "size": size._asdict(),
+        "counts": counts,
+        "repeat": args.repeat,
+        "step_runner": args.step_runner,
+        "phases": phases,
+    }
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            lines = compare(results, json.load(baseline))
+    else:
+        lines = ["{:<12} {:>9.4f}s".format(phase, phases[phase]) for phase in PHASES]
+    print("\n".join(lines))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
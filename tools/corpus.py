@@ -0,0 +1,167 @@
+"""
+Generate a synthetic corpus of features and steps for benchmarking.
+"""
+
+from __future__ import unicode_literals
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import io
+import os
+from collections import namedtuple
+
+
+CorpusSize = namedtuple(
+    "CorpusSize", ("features", "scenarios", "steps", "outline_rows", "definitions", "hooks", "table_rows")
+)
+CorpusSize.__doc__ = """
+The size of a corpus: the number of features, scenarios per feature, steps
+per scenario, example rows per outline (every other scenario is an outline),
+step definitions, callbacks of each kind and rows in the step tables.
+"""
+
+DEFAULT_SIZE = CorpusSize(features=20, scenarios=10, steps=8, outline_rows=5, definitions=200, hooks=2, table_rows=3)
+
+# Table cells in different scripts and with wide characters
+UNICODE_WORDS = (
+    "naïve",
+    "Ünïcödé",
+    "размер",
+    "κόσμος",
+    "数据表",
+    "テスト",
+    "한국어",
+    "😀🚀",
+    "مرحبا",
+    "שלום",
+)
+
+
+def sentence(definition, value):
+    """The sentence of a step using the given definition."""
+    return 'I perform operation {} number {} with "{}"'.format(definition % 7, definition, value)
+
+
+def conftest(size):
+    """The source of the step definitions and callbacks."""
+
+    lines = [
+        "from contextlib import contextmanager",
+        "",
+        "from aloe import after, around, before, step, world",
+        "",
+    ]
+
+    for definition in range(size.definitions):
+        lines += [
+            "",
+            '@step(r\'I perform operation {} number {} with "([^"]*)"\')'.format(definition % 7, definition),
+            "def step_{}(self, value):".format(definition),
+            "    world.value = value",
+            "",
+        ]
+
+    for hook in range(size.hooks):
+        for what in ("step", "example"):
+            lines += [
+                "",
+                "@before.each_{}".format(what),
+                "def before_{}_{}(*args):".format(what, hook),
+                "    world.count = getattr(world, 'count', 0) + 1",
+                "",
+                "",
+                "@after.each_{}".format(what),
+                "def after_{}_{}(*args):".format(what, hook),
+                "    world.count -= 1",
+                "",
+                "",
+                "@around.each_{}".format(what),
+                "@contextmanager",
+                "def around_{}_{}(*args):".format(what, hook),
+                "    yield",
+                "",
+            ]
+
+    return "\n".join(lines) + "\n"
+
+
+def table(size, seed):
+    """A step table with unicode cells."""
+
+    rows = [["word", "translation", "count"]]
+    rows += [
+        [
+            UNICODE_WORDS[(seed + row) % len(UNICODE_WORDS)],
+            UNICODE_WORDS[(seed + row * 3 + 1) % len(UNICODE_WORDS)] * 2,
+            str(row),
+        ]
+        for row in range(size.table_rows)
+    ]
+    return ["      | " + " | ".join(row) + " |" for row in rows]
+
+
+def feature(size, number):
+    """The source of a feature file."""
+
+    keywords = ("Given", "When", "Then", "And")
+    lines = [
+        "@feature{}".format(number),
+        "Feature: Synthetic feature {}".format(number),
+        "",
+        "  A generated feature for benchmarking.",
+        "",
+        "  Background:",
+        "    Given " + sentence(number % size.definitions, "background"),
+    ]
+
+    for scenario in range(size.scenarios):
+        outline = scenario % 2 == 1 and size.outline_rows > 0
+        lines += [
+            "",
+            "  @scenario{} @{}".format(scenario, "outline" if outline else "plain"),
+            "  Scenario{}: Synthetic scenario {}".format(" Outline" if outline else "", scenario),
+        ]
+
+        for step_index in range(size.steps):
+            definition = (number * size.scenarios * size.steps + scenario * size.steps + step_index) % size.definitions
+            value = "<value>" if outline and step_index == 0 else UNICODE_WORDS[step_index % len(UNICODE_WORDS)]
+            lines.append("    {} {}".format(keywords[min(step_index, 3)], sentence(definition, value)))
+            if size.table_rows and step_index == size.steps - 1:
+                lines += table(size, scenario)
+
+        if outline:
+            lines += ["", "    Examples:", "      | value | other |"]
+            lines += [
+                "      | {} {} | {} |".format(UNICODE_WORDS[row % len(UNICODE_WORDS)], row, row)
+                for row in range(size.outline_rows)
+            ]
+
+    return "\n".join(lines) + "\n"
+
+
+def write_corpus(directory, size=DEFAULT_SIZE):
+    """
+    Write a corpus to the directory: features/conftest.py with the steps and
+    callbacks, and the feature files. Return the feature file names.
+    """
+
+    features_dir = os.path.join(directory, "features")
+    if not os.path.isdir(features_dir):
+        os.makedirs(features_dir)
+
+    # Anchor pytest in the corpus directory
+    with io.open(os.path.join(directory, "pytest.ini"), "w", encoding="utf-8") as ini:
+        ini.write("[pytest]\n")
+
+    with io.open(os.path.join(features_dir, "conftest.py"), "w", encoding="utf-8") as steps:
+        steps.write(conftest(size))
+
+    filenames = []
+    for number in range(size.features):
+        filename = os.path.join(features_dir, "synthetic_{:04}.feature".format(number))
+        with io.open(filename, "w", encoding="utf-8") as feature_file:
+            feature_file.write(feature(size, number))
+        filenames.append(filename)
+
+    return filenames